@@ -0,0 +1,64 @@
+"""Microbenchmark of reading Conifer values by attribute and by key.
+
+Attribute access returns dicts of the config built once per subtree of a snapshot, which
+cache the values read from them as attributes, so reading through a held view costs about
+as much as indexing the plain config dict. `conf.<key>` doesn't: CPython only calls
+`Conifer.__getattr__` to find the current snapshot once its normal attribute lookup
+failed, which costs several times a dict lookup. Hold on to a view in hot loops.
+
+    python benchmarks/bench_attribute_access.py
+"""
+import timeit
+
+from conifer import Conifer
+
+
+# a wide config, since attribute access used to copy every dict it passed through
+SCHEMA = {
+    "properties": dict(
+        [
+            (
+                "section_{}".format(section),
+                {
+                    "type": "object",
+                    "default": {},
+                    "properties": dict(
+                        ("key_{}".format(key), {"type": "integer", "default": key})
+                        for key in range(50)
+                    ),
+                },
+            )
+            for section in range(50)
+        ]
+        + [
+            (
+                "http",
+                {
+                    "type": "object",
+                    "default": {},
+                    "properties": {"timeout": {"type": "number", "default": 1.5}},
+                },
+            )
+        ]
+    )
+}
+
+
+def main(number=1000000):
+    conf = Conifer(SCHEMA, sources=[])
+    config = conf.as_dict()
+    http = conf.http
+
+    cases = [
+        ("plain dict", lambda: config["http"]["timeout"]),
+        ("conf[...][...]", lambda: conf["http"]["timeout"]),
+        ("conf.http.timeout", lambda: conf.http.timeout),
+        ("http.timeout", lambda: http.timeout),
+    ]
+    for name, read in cases:
+        seconds = min(timeit.repeat(read, number=number, repeat=3))
+        print("{:<20} {:>8.1f} ns/read".format(name, seconds / number * 1e9))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Benchmark of constructing many Conifers from the same schema.
+
+Compares construction with the validated schema memo cleared before each Conifer, as if
+every Conifer validated its schema against the metaschema, against the memoized
+validation used by default.
+
+    python benchmarks/bench_construction.py
+"""
+import timeit
+
+from conifer import Conifer
+from conifer import conifer
+
+SCHEMA = {
+    "properties": dict(
+        (
+            "section_{}".format(section),
+            {
+                "type": "object",
+                "default": {},
+                "properties": dict(
+                    ("key_{}".format(key), {"type": "integer", "default": key})
+                    for key in range(10)
+                ),
+            },
+        )
+        for section in range(10)
+    )
+}
+
+
+def main(number=50):
+    def unmemoized():
+        conifer._valid_schemas.clear()
+        Conifer(SCHEMA, sources=[])
+
+    def memoized():
+        Conifer(SCHEMA, sources=[])
+
+    for name, construct in [("unmemoized", unmemoized), ("memoized", memoized)]:
+        seconds = min(timeit.repeat(construct, number=number, repeat=3))
+        print("{:<12} {:>10.1f} us/Conifer".format(name, seconds / number * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark of `import conifer` time, using `python -X importtime`.
+
+jsonschema, pyrsistent and yaml are only imported once a code path needs them, so
+`import conifer` alone must not import them. Exits with an error if it does, so this can
+guard against import time regressions.
+
+    python benchmarks/bench_import_time.py
+"""
+import os
+import subprocess
+import sys
+
+# Imported lazily by conifer, and slow to import
+LAZY_MODULES = ["jsonschema", "pyrsistent", "yaml"]
+
+
+def import_times(statement):
+    """Return {module: cumulative microseconds} for the imports done by statement."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(os.path.abspath(__file__)))]
+        + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else [])
+    )
+    output = subprocess.check_output(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        stderr=subprocess.STDOUT,
+        env=env,
+    ).decode("utf-8")
+
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+def main(repeat=5):
+    best = None
+    for _ in range(repeat):
+        times = import_times("import conifer")
+        if best is None or times["conifer"] < best["conifer"]:
+            best = times
+    print("{:<28} {:>8.1f} ms".format("import conifer", best["conifer"] / 1000.0))
+
+    for module in LAZY_MODULES:
+        times = import_times("import {}".format(module))
+        print("{:<28} {:>8.1f} ms".format("import " + module, times[module] / 1000.0))
+
+    eager = [module for module in LAZY_MODULES if module in best]
+    if eager:
+        print("import conifer imports {}".format(", ".join(eager)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Benchmark of constructing a Conifer with a large source only some processes read.
+
+Compares loading a feature-flag JSON file on init against wrapping it in a LazySource,
+which defers loading it until a flag is read. Memory is the peak allocated while
+constructing, measured with tracemalloc.
+
+    python benchmarks/bench_lazy_sources.py
+"""
+import json
+import os
+import shutil
+import tempfile
+import timeit
+import tracemalloc
+
+from conifer import Conifer
+from conifer.sources import DictLoader, JSONFileLoader, LazySource
+
+
+def make_schema(flags):
+    return {
+        "properties": {
+            "service": {
+                "type": "object",
+                "default": {},
+                "properties": {
+                    "name": {"type": "string", "default": "bench"},
+                    "port": {"type": "integer", "default": 8000},
+                },
+            },
+            "features": {
+                "type": "object",
+                "default": {},
+                "properties": dict(
+                    ("flag_{}".format(flag), {"type": "boolean", "default": False})
+                    for flag in range(flags)
+                ),
+            },
+        }
+    }
+
+
+def main(flags=2000, number=10):
+    # compiled once, as services constructing several Conifers would
+    schema = Conifer(make_schema(flags), sources=[]).plan
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "flags.json")
+        with open(path, "w") as flags_file:
+            json.dump(
+                {"features": dict(("flag_{}".format(f), True) for f in range(flags))},
+                flags_file,
+            )
+        service = DictLoader({"service": {"port": 9000}})
+
+        def eager():
+            return Conifer(schema, sources=[JSONFileLoader(path), service])
+
+        def lazy():
+            source = LazySource(JSONFileLoader(path), provides=["features"])
+            return Conifer(schema, sources=[source, service])
+
+        def lazy_read():
+            return lazy().features.flag_0
+
+        for name, construct in [
+            ("eager", eager),
+            ("lazy", lazy),
+            ("lazy+read", lazy_read),
+        ]:
+            tracemalloc.start()
+            construct()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            seconds = min(timeit.repeat(construct, number=number, repeat=3))
+            print(
+                "{:<10} {:>10.1f} ms/Conifer {:>10.1f} KiB peak".format(
+                    name, seconds / number * 1e3, peak / 1024.0
+                )
+            )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
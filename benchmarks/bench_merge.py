@@ -0,0 +1,68 @@
+"""Benchmark of merging sources on reload, in time and memory allocated.
+
+Compares the previous merge, a deepcopy of the defaults updated with a deepcopy of every
+source's config, against `utils.merge_layers` sharing unchanged subtrees with the last
+merged config. Memory is measured with tracemalloc: the peak allocated while merging, and
+what the merged config keeps alive.
+
+    python benchmarks/bench_merge.py
+"""
+from copy import deepcopy
+import timeit
+import tracemalloc
+
+from conifer.utils import merge_layers, recursive_update
+
+
+def make_layers(sections=50, keys=100):
+    """Return defaults for every key, and two sources each setting a few keys."""
+    defaults = dict(
+        (
+            "section_{}".format(section),
+            dict(("key_{}".format(key), key) for key in range(keys)),
+        )
+        for section in range(sections)
+    )
+    json_file = {"section_0": {"key_0": "from file"}, "section_1": {"key_1": 1.5}}
+    environment = {"section_2": {"key_2": "from env"}}
+    return [defaults, json_file, environment]
+
+
+def deepcopy_merge(layers, previous):
+    config = deepcopy(layers[0])
+    for layer in layers[1:]:
+        recursive_update(config, deepcopy(layer))
+    return config
+
+
+def measure(merge, layers, previous):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    config = merge(layers, previous)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    seconds = min(timeit.repeat(lambda: merge(layers, previous), number=20, repeat=3))
+    return config, (peak - before) / 1024.0, (current - before) / 1024.0, seconds / 20
+
+
+def main():
+    layers = make_layers()
+    previous = merge_layers(layers)
+    # a reload changing one value
+    layers[2] = {"section_2": {"key_2": "changed"}}
+
+    print("{:<16} {:>10} {:>12} {:>12}".format("", "time", "peak", "retained"))
+    results = []
+    for name, merge in [("deepcopy", deepcopy_merge), ("merge_layers", merge_layers)]:
+        config, peak, retained, seconds = measure(merge, layers, previous)
+        results.append(config)
+        print(
+            "{:<16} {:>7.0f} us {:>8.1f} KiB {:>8.1f} KiB".format(
+                name, seconds * 1e6, peak, retained
+            )
+        )
+    assert results[0] == results[1]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark of constructing a Conifer for a few sections of a large shared schema.
+
+Compares a Conifer of the whole schema against one restricted with `sections` to the two
+sections a service uses. Memory is the peak allocated while constructing, measured with
+tracemalloc.
+
+    python benchmarks/bench_sections.py
+"""
+import timeit
+import tracemalloc
+
+from conifer import Conifer
+from conifer.sources import DictLoader
+
+
+def make_schema(sections=50, keys=100):
+    """Return a schema of many sections, each referring to a shared definition."""
+    return {
+        "definitions": {"port": {"type": "integer", "minimum": 1}},
+        "properties": dict(
+            (
+                "section_{}".format(section),
+                {
+                    "type": "object",
+                    "default": {},
+                    "properties": dict(
+                        [("port", {"$ref": "#/definitions/port"})]
+                        + [
+                            ("key_{}".format(key), {"type": "integer", "default": key})
+                            for key in range(keys)
+                        ]
+                    ),
+                },
+            )
+            for section in range(sections)
+        ),
+    }
+
+
+def main(number=5):
+    schema = make_schema()
+    source = DictLoader({"section_0": {"port": 8080}, "section_1": {"port": 9090}})
+
+    def whole():
+        return Conifer(schema, sources=[source])
+
+    def selected():
+        return Conifer(schema, sources=[source], sections=["section_0", "section_1"])
+
+    for name, construct in [("whole", whole), ("sections", selected)]:
+        tracemalloc.start()
+        construct()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        seconds = min(timeit.repeat(construct, number=number, repeat=3))
+        print(
+            "{:<10} {:>10.1f} ms/Conifer {:>10.1f} KiB peak".format(
+                name, seconds / number * 1e3, peak / 1024.0
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
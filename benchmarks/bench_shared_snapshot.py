@@ -0,0 +1,69 @@
+"""Benchmark of worker startup with and without a shared snapshot.
+
+Compares every worker resolving the configuration itself, with JSON file and environment
+sources, against attaching to a snapshot published once with `Conifer.publish`. Reading
+from an attached SharedConfig only checks the published file's stale flag.
+
+    python benchmarks/bench_shared_snapshot.py
+"""
+import json
+import os
+import shutil
+import tempfile
+import timeit
+
+from conifer import Conifer
+from conifer.shared import SharedConfig
+from conifer.sources import EnvironmentConfigLoader, JSONFileLoader
+
+# a wide config of 50 sections of 50 integers each
+SCHEMA = {
+    "properties": dict(
+        (
+            "section_{}".format(section),
+            {
+                "type": "object",
+                "default": {},
+                "properties": dict(
+                    ("key_{}".format(key), {"type": "integer", "default": key})
+                    for key in range(50)
+                ),
+            },
+        )
+        for section in range(50)
+    )
+}
+
+
+def main(number=20):
+    directory = tempfile.mkdtemp()
+    try:
+        config_path = os.path.join(directory, "config.json")
+        with open(config_path, "w") as fp:
+            json.dump({"section_0": {"key_0": 100}}, fp)
+        shared_path = os.path.join(directory, "snapshot")
+
+        def resolve():
+            return Conifer(
+                SCHEMA,
+                sources=[JSONFileLoader(config_path), EnvironmentConfigLoader()],
+            )
+
+        resolve().publish(shared_path)
+        shared = SharedConfig(shared_path)
+
+        cases = [
+            ("resolve in worker", resolve, number),
+            ("attach SharedConfig", lambda: SharedConfig(shared_path).close(), number),
+            ("read SharedConfig", lambda: shared.section_0.key_0, number * 10000),
+        ]
+        for name, run, count in cases:
+            seconds = min(timeit.repeat(run, number=count, repeat=3))
+            print("{:<20} {:>12.1f} us".format(name, seconds / count * 1e6))
+        shared.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark of validating a whole configuration, as done on every reload.
+
+Compares `Draft4Validator` interpreting the schema against the code generated for it by
+`conifer.validation.compile_validator`, for schemas of increasing size.
+
+    python benchmarks/bench_validation.py
+"""
+import timeit
+
+from jsonschema import Draft4Validator
+
+from conifer.validation import compile_validator
+
+
+def make_schema(sections, keys):
+    """Return a schema of sections holding keys of a few types, and a valid config."""
+    schema = {"properties": {}, "definitions": {"port": {"type": "integer"}}}
+    config = {}
+    for section in range(sections):
+        properties = {}
+        values = {}
+        for key in range(keys):
+            name = "key_{}".format(key)
+            if key % 3 == 0:
+                properties[name] = {"type": "integer", "minimum": 0}
+                values[name] = key
+            elif key % 3 == 1:
+                properties[name] = {"type": "string", "maxLength": 20}
+                values[name] = "value"
+            else:
+                properties[name] = {"$ref": "#/definitions/port"}
+                values[name] = 8080
+        name = "section_{}".format(section)
+        schema["properties"][name] = {"type": "object", "properties": properties}
+        config[name] = values
+    return schema, config
+
+
+def main(number=20):
+    print("{:>6} {:>14} {:>14} {:>8}".format("keys", "Draft4", "compiled", "speedup"))
+    for sections, keys in [(1, 10), (10, 10), (10, 100), (50, 100)]:
+        schema, config = make_schema(sections, keys)
+        draft4 = Draft4Validator(schema)
+        compiled = compile_validator(schema)
+        assert draft4.is_valid(config) and compiled.is_valid(config)
+
+        times = []
+        for validate in (draft4.validate, compiled.validate):
+            seconds = min(
+                timeit.repeat(lambda: validate(config), number=number, repeat=3)
+            )
+            times.append(seconds / number * 1e6)
+        print(
+            "{:>6} {:>11.1f} us {:>11.1f} us {:>7.0f}x".format(
+                sections * keys, times[0], times[1], times[0] / times[1]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Asyncio support for Conifer, see `Conifer.update_config_async`, `Refresher` and
+`Conifer.scoped`."""
+import asyncio
+import time
+
+
+async def update_config_async(conf, sources=None):
+    # the running loop, get_running_loop is py3.7+
+    loop = asyncio.get_event_loop()
+    lock = conf._update_lock
+    acquired = False
+    try:
+        # serialize with other reloads, without blocking the event loop
+        acquire = loop.run_in_executor(None, lock.acquire)
+        try:
+            await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            # the executor thread still takes the lock
+            _release_when_done(acquire, lock)
+            raise
+        acquired = True
+
+        indexes = conf._indexes_to_load(sources)
+        loaded = await asyncio.gather(
+            *[_load_source(loop, conf._sources[index], conf._plan) for index in indexes]
+        )
+        # merging and validating is CPU bound, keep it off the event loop too
+        publish = loop.run_in_executor(None, conf._publish, indexes, list(loaded))
+        try:
+            changes = await asyncio.shield(publish)
+        except asyncio.CancelledError:
+            # the snapshot is still published, keep other reloads out until it is
+            acquired = False
+            _release_when_done(publish, lock)
+            raise
+    finally:
+        if acquired:
+            lock.release()
+    conf._notify()
+    return changes
+
+
+def _release_when_done(future, lock):
+    """Release lock once future, running in an executor while holding it, is done."""
+
+    def release(future):
+        lock.release()
+        if not future.cancelled():
+            # retrieve any error, so it isn't logged as never retrieved
+            future.exception()
+
+    future.add_done_callback(release)
+
+
+async def _load_source(loop, source, plan):
+    load_config_async = getattr(source, "load_config_async", None)
+    if load_config_async is not None:
+        return await load_config_async(plan)
+    return await loop.run_in_executor(None, source.load_config, plan)
+
+
+async def refresh_forever(refresher):
+    """Refresh a Conifer on the refresher's schedule until it is stopped."""
+    stats = refresher.stats
+    while not refresher._stop.is_set():
+        await asyncio.sleep(refresher.next_delay())
+        if refresher._stop.is_set():
+            break
+
+        start = time.monotonic()
+        try:
+            await update_config_async(refresher._conf)
+        except Exception as error:
+            stats.record(time.monotonic() - start, error)
+        else:
+            stats.record(time.monotonic() - start)
+
+
+class AsyncContextMixin(object):
+    """Adds `async with` support to a synchronous, non-blocking context manager."""
+
+    async def __aenter__(self):
+        return self._enter_async()
+
+    def _enter_async(self):
+        """Enter the context manager from `async with`, by default like `with`."""
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return self.__exit__(exc_type, exc_value, traceback)
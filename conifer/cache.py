@@ -0,0 +1,130 @@
+"""Resolved configuration cache module for Conifer
+
+This module provides the `ConfigCache` used by `Conifer(..., cache_path=...)`. It stores the
+configuration resolved on startup in a file, along with a fingerprint of everything it was
+resolved from: the schema, `initial_config` and a fingerprint from every source. When the
+fingerprint still matches on the next startup, the stored configuration is used as is,
+skipping schema validation, loading sources and validating their configuration.
+
+Sources take part by defining `cache_fingerprint(schema)`, returning a JSON-serializable
+value which changes whenever the configuration they would load changes, or None if they
+can't tell. If any source can't, nothing is cached.
+
+The cache file is unpickled, so it must only be writable by trusted users. It is created
+with mode 0600.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # py2
+    from collections import Mapping
+
+from .sources.schema_utils import SchemaPlan
+from .utils import replace_file
+
+# Bump when the cached data or fingerprints change meaning
+_FORMAT_VERSION = 2
+
+
+class ConfigCache(object):
+    """Cache of one Conifer's resolved configuration, see module docstring.
+
+    Parameters
+    ----------
+    path : str
+        File to store the cache in. Its directory must exist.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def fingerprint(self, schema, sources, initial_config):
+        """Return a fingerprint of the inputs of the resolved configuration.
+
+        Only stable inputs are fingerprinted, so the fingerprint is the same in every
+        process resolving the same configuration.
+
+        Returns
+        -------
+        str, or None if a source doesn't support caching, or an input holds values which
+        can't be fingerprinted
+        """
+        from pyrsistent import thaw
+
+        source_fingerprints = []
+        for source in sources:
+            cache_fingerprint = getattr(source, "cache_fingerprint", None)
+            if cache_fingerprint is None:
+                return None
+            fingerprint = cache_fingerprint(schema)
+            if fingerprint is None:
+                return None
+            source_type = type(source)
+            source_fingerprints.append(
+                [source_type.__module__, source_type.__name__, fingerprint]
+            )
+
+        if isinstance(schema, SchemaPlan):
+            schema = schema.schema
+        inputs = [_FORMAT_VERSION, thaw(schema), initial_config, source_fingerprints]
+        try:
+            encoded = json.dumps(inputs, sort_keys=True, default=_json_default)
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+    def load(self, fingerprint):
+        """Return the cached data for fingerprint, or None if the cache doesn't match.
+
+        Any unreadable cache file is treated as a mismatch.
+        """
+        try:
+            with open(self.path, "rb") as fp:
+                cached = pickle.load(fp)
+        except Exception:
+            return None
+        if not isinstance(cached, dict) or cached.get("fingerprint") != fingerprint:
+            return None
+        return cached
+
+    def store(self, fingerprint, **data):
+        """Atomically replace the cache with data for fingerprint.
+
+        Failing to write the cache only loses the speedup, so errors are ignored.
+        """
+        data["fingerprint"] = fingerprint
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory)
+        except (IOError, OSError):
+            return
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                pickle.dump(data, fp, pickle.HIGHEST_PROTOCOL)
+            replace_file(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def _json_default(value):
+    """Encode frozen values and sets, which json doesn't know, for fingerprints.
+
+    Raises TypeError for other values, whose only encoding might differ between
+    processes, like a repr including a memory address.
+    """
+    from pyrsistent import PMap, PSet, PVector
+
+    if isinstance(value, (Mapping, PMap)):
+        return dict(value)
+    if isinstance(value, PVector):
+        return list(value)
+    if isinstance(value, (set, frozenset, PSet)):
+        # the iteration order of sets differs between processes
+        return sorted(value, key=lambda item: json.dumps(item, default=_json_default))
+    raise TypeError("Can't fingerprint {!r}".format(type(value)))
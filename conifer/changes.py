@@ -0,0 +1,159 @@
+"""Change tracking module for Conifer
+
+This module provides the `ChangeSet` returned by `Conifer.update_config`, describing which
+configuration values a reload changed, and the structural diff computing it.
+"""
+try:
+    from collections.abc import Mapping
+except ImportError:  # py2
+    from collections import Mapping
+
+from .derivations import LazyDict
+from .utils import same_value
+
+# Sentinel for keys missing on one side of a diff
+_MISSING = object()
+# Sentinel for lazy values which weren't derived or loaded yet
+_PENDING = object()
+
+
+class ChangeSet(object):
+    """The configuration values which differ between two Snapshots.
+
+    Changes are key paths, as deep as the change: changing `db.host` changes ('db', 'host'),
+    while replacing `db` with a non-dict value changes ('db',). Added and removed keys are
+    changes too. Lazily derived values are only compared if both snapshots evaluated them.
+    Values at the prefix of a lazy source which isn't loaded yet are compared as merged
+    from the other sources.
+
+    Attributes
+    ----------
+    old : Snapshot
+        Snapshot before the change
+    new : Snapshot
+        Snapshot after the change
+    paths : tuple
+        Changed key paths, as tuples of keys
+    """
+
+    __slots__ = ("old", "new", "paths")
+
+    def __init__(self, old, new, paths=None):
+        self.old = old
+        self.new = new
+        if paths is None:
+            paths = changed_paths(
+                old._config, new._config, bases=(old._base, new._base)
+            )
+        self.paths = tuple(sorted(paths))
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __bool__(self):
+        return bool(self.paths)
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return "ChangeSet({!r})".format([".".join(path) for path in self.paths])
+
+    def affects(self, prefix):
+        """Return whether any value at or below prefix changed.
+
+        Parameters
+        ----------
+        prefix : str or list
+            Dotted key path like 'db.' or 'db.host', or a list of keys. '' matches all.
+        """
+        return bool(self.under(prefix))
+
+    def under(self, prefix):
+        """Return the ChangeSet of only the changes at or below prefix, see `affects`."""
+        prefix = as_prefix(prefix)
+        return ChangeSet(
+            self.old,
+            self.new,
+            [path for path in self.paths if overlaps(path, prefix)],
+        )
+
+
+def as_prefix(prefix):
+    """Return a dotted key prefix like 'db.' or a list of keys as a tuple of keys."""
+    if isinstance(prefix, str):
+        return tuple(part for part in prefix.split(".") if part)
+    return tuple(prefix)
+
+
+def overlaps(path, prefix):
+    """Whether a change at path changes values at or below prefix.
+
+    That is when either is nested inside the other, eg. replacing all of ('db',) changes
+    ('db', 'host').
+    """
+    size = min(len(path), len(prefix))
+    return path[:size] == prefix[:size]
+
+
+def changed_paths(old, new, prefix=(), bases=None):
+    """Return the paths of the values which differ between configs old and new.
+
+    Nested dicts are compared key by key, so a path is as deep as the change. Added and
+    removed keys are changed too. Subtrees shared by both configs are skipped by identity.
+    Values of different types are changed even if equal, eg. 0 and False, see `same_value`.
+    Lazy values of a LazyDict are never evaluated, and skipped if either side has one.
+
+    bases are the (old, new) configs merged from sources, which old and new were derived
+    from, see `Snapshot`. If passed, keys lazy on both sides are compared in them instead,
+    so values from other sources at the prefix of a lazy source which isn't loaded yet
+    are compared too.
+    """
+    paths = []
+    keys = set(old).union(new)
+    if bases is not None:
+        keys.update(_lazy_keys(old), _lazy_keys(new))
+    for key in keys:
+        old_value = _peek(old, key)
+        new_value = _peek(new, key)
+        sub_bases = None
+        if bases is not None:
+            sub_bases = (_peek(bases[0], key), _peek(bases[1], key))
+            if old_value is _PENDING and new_value is _PENDING:
+                # compare what the sources merged before the lazy value replaced it
+                old_value, new_value = sub_bases
+        if old_value is new_value:
+            continue
+        if old_value is _PENDING or new_value is _PENDING:
+            continue
+        if isinstance(old_value, Mapping) and isinstance(new_value, Mapping):
+            paths.extend(
+                changed_paths(old_value, new_value, prefix + (key,), sub_bases)
+            )
+        elif not same_value(old_value, new_value):
+            paths.append(prefix + (key,))
+    return paths
+
+
+def _lazy_keys(dic):
+    """Return the keys of the lazy values of dic, if it is a LazyDict."""
+    if isinstance(dic, LazyDict):
+        return dic._lazy
+    return ()
+
+
+def _peek(dic, key):
+    """Return the value of key in dic, without evaluating lazy values of a LazyDict.
+
+    dic may be any value, which has no keys unless it is a Mapping.
+    """
+    if not isinstance(dic, Mapping):
+        return _MISSING
+    if isinstance(dic, LazyDict):
+        value = dict.get(dic, key, _MISSING)
+        if value is _MISSING and key in dic._lazy:
+            return _PENDING
+        return value
+    return dic.get(key, _MISSING)
@@ -6,7 +6,6 @@ Click CLI options and consume them as a regular Conifer object.
 from functools import wraps, reduce
 
 from .sources.click_opts import ClickOptionLoader
-from .sources.schema_utils import iter_schema
 
 
 def click_wrap(conf):
@@ -49,12 +48,13 @@ def click_wrap(conf):
     def decorator(fn):
         #
         # Create click options and store data that maps the internal kwarg name to
-        # the created click.option and to the schema path location
+        # the created click.option and to the compiled schema leaf
         #
         click_options = {}
         schema_info = {}
-        for schema_path, schema in iter_schema(conf._schema):
-            option_flag = "--{}".format("-".join(schema_path).replace("_", "-"))
+        for leaf in conf.plan.leaves:
+            schema = leaf.schema
+            option_flag = "--{}".format("-".join(leaf.path).replace("_", "-"))
             option_kwarg_name = _get_option_name(option_flag)
 
             # Kwargs for this new click.option
@@ -62,7 +62,7 @@ def click_wrap(conf):
             if schema.get("description"):
                 option_config["help"] = schema.get("description")
 
-            default = conf.get_in(schema_path)
+            default = conf.get_in(leaf.path)
             if default is not None:
                 option_config["default"] = default
                 option_config["show_default"] = True
@@ -74,10 +74,7 @@ def click_wrap(conf):
             click_option = option(option_flag, **option_config)
 
             click_options[option_kwarg_name] = click_option
-            schema_info[option_kwarg_name] = {
-                "schema": schema,
-                "schema_path": schema_path,
-            }
+            schema_info[option_kwarg_name] = leaf
 
         @wraps(fn)
         def wrapper(*args, **kwargs):
@@ -1,17 +1,28 @@
 # builtin
 from copy import deepcopy
+from collections import deque, namedtuple
 from functools import wraps, reduce
 import json
 import os
+import threading
 
-# third party
-from jsonschema import Draft4Validator, validators
-from pyrsistent import freeze, thaw
+try:
+    from collections.abc import Mapping
+except ImportError:  # py2
+    from collections import Mapping
+
+# third party: jsonschema and pyrsistent are imported where they are used, so that
+# `import conifer` stays fast
 
 # this package
+from .changes import ChangeSet, as_prefix, changed_paths, overlaps
+from .derivations import DerivationGraph, LazyDict, _as_lazy_dict, materialize
 from .sources import EnvironmentConfigLoader, ClickOptionLoader
-from .sources.schema_utils import iter_schema
-from .utils import get_in, recursive_update, set_in
+from .sources.schema_utils import SchemaPlan, resolve_pointer, select_sections
+from .utils import get_in, merge_layers, merge_paths
+
+# Sentinel for arguments which were not passed
+_MISSING = object()
 
 
 class Conifer(object):
@@ -31,19 +42,41 @@ class Conifer(object):
         You must supply a new key name, the config options it depends on, and a function
         taking the values of those options to return the derived value.
 
-        Derived values are exposed in the final Conifer object
+        Derived values are exposed in the final Conifer object. Derivations may take other
+        derived values as parameters; they are evaluated in dependency order, and on reload
+        only derivations whose parameter values changed are evaluated again.
         Derivations are supplied as a dictionary of the format
 
             'KEY': {
                 'description': 'helpful text',
                 'derivation': lambda x, y: x + y,
                 'parameters': [['KEY'], ['NESTED', 'KEY']],
+                'lazy': False,
             }
 
+        Expensive derivations can set `'lazy': True` to be derived on first access instead
+        of on reload. Lazy values are re-used until one of their parameter values changes.
+
+    Lazy sources:
+        Sources only needed by some code paths can be loaded on first access instead of on
+        init. Such sources declare the key prefixes they provide with a `provides`
+        attribute, or are wrapped in `conifer.sources.LazySource`:
+
+            LazySource(JSONFileLoader('flags.json'), provides=['features'])
+
+        Their `load_config` isn't called until a value at or below one of their prefixes is
+        read (including by `as_dict`, `explain` and `publish`), or until they are passed to
+        `update_config(sources=...)`. Then they are merged in the order of `sources` like
+        any other source, and published as a new Snapshot. Until then, reading any value
+        below their prefixes loads them, even values set by other sources. Loading errors
+        are raised to the reader. Once loaded, they are reloaded like any other source.
+        Sources whose prefixes non-lazy derivations depend on are loaded on init.
+
     Parameters
     ----------
-    schema : dict
-        JSONSchema Draft 4 compatible schema definition
+    schema : dict or SchemaPlan
+        JSONSchema Draft 4 compatible schema definition. An already compiled SchemaPlan
+        (eg. `other_conf.plan`) may be passed to skip validating and compiling the schema.
 
     Kwargs
     ------
@@ -57,10 +90,26 @@ class Conifer(object):
         including schema defaults.
     skip_load_on_init : bool (False)
          Skip loading configuration during `__init__`
+    max_workers : int
+        Load sources concurrently on a thread pool of this many threads. Results are still
+        merged in the order of `sources`. By default sources are loaded one after another.
+        The threads are started on first use, and shut down by `close`.
+    cache_path : str
+        Cache the configuration resolved in `__init__` in this file. While the schema,
+        `initial_config` and every source's `cache_fingerprint` are unchanged, later
+        Conifers skip validating the schema and loading and validating sources, and use
+        the cached configuration. Derivations are still evaluated. See `conifer.cache`.
+    sections : list
+        Only use these top-level properties of the schema, eg. ['db', 'http'] of a schema
+        shared by many services. Defaults, sources, validation and `click_wrap` only see
+        those sections, so startup and reloads scale with them rather than with the whole
+        schema. `$ref`s into other parts of the schema still resolve. Sources may still
+        return values of other sections, which are neither coerced nor validated. See
+        `conifer.sources.schema_utils.select_sections`.
     """
 
-    # The populated configuration data, should be a plain dict
-    _config = None
+    # The current Snapshot of the populated configuration
+    _snapshot = None
 
     def __init__(
         self,
@@ -69,146 +118,1011 @@ class Conifer(object):
         derivations=None,
         initial_config=None,
         skip_load_on_init=False,
+        max_workers=None,
+        cache_path=None,
+        sections=None,
     ):
-        # Very bad things happen if schema is modified
-        schema = freeze(schema)
-        # ensure we have a valid JSON Schema
-        _validate_schema(schema)
-        self._schema = schema
+        if sources is None:
+            sources = [EnvironmentConfigLoader()]
+        full_schema = None
+        if sections is not None:
+            full_schema = schema
+            schema = select_sections(schema, sections)
 
-        DefaultSettingValidator = _extend_with_default(Draft4Validator)
-        self._config = initial_config or {}
-        # update self._config with default values from the schema
-        # since this uses setdefault, it shouldn't override initial_config
-        # Uses thawed copy of schema because jsonschema wants a regular dict
-        DefaultSettingValidator(thaw(schema)).validate(self._config)
+        # Resolved configuration from a previous run, see `conifer.cache`
+        cache = cached = fingerprint = None
+        if cache_path is not None and not skip_load_on_init:
+            from .cache import ConfigCache
 
-        self._validator = Draft4Validator(self._schema)
+            cache = ConfigCache(cache_path)
+            fingerprint = cache.fingerprint(schema, sources, initial_config)
+            if fingerprint is not None:
+                cached = cache.load(fingerprint)
 
-        if sources is None:
-            self._sources = [EnvironmentConfigLoader()]
+        if isinstance(schema, SchemaPlan):
+            plan = schema
+            schema = plan.schema
         else:
-            self._sources = sources
+            from pyrsistent import freeze
 
-        self._derivations = derivations
+            # Very bad things happen if schema is modified
+            schema = freeze(schema)
+            # ensure we have a valid JSON Schema, unless it was cached as valid
+            if cached is None:
+                _validate_schema(schema)
+            plan = SchemaPlan(schema, full_schema=full_schema)
 
-        if not skip_load_on_init:
+        if cached is not None:
+            self._defaults = cached["defaults"]
+        else:
+            from jsonschema import Draft4Validator
+            from pyrsistent import thaw
+
+            DefaultSettingValidator = _extend_with_default(Draft4Validator)
+            # Configuration that sources are loaded on top of
+            self._defaults = deepcopy(initial_config) if initial_config else {}
+            # update self._defaults with default values from the schema
+            # since this uses setdefault, it shouldn't override initial_config
+            # Uses thawed copy of schema because jsonschema wants a regular dict
+            DefaultSettingValidator(thaw(schema)).validate(self._defaults)
+        self._snapshot = Snapshot(
+            deepcopy(self._defaults),
+            generation=0,
+            layers=(("defaults", self._defaults),),
+        )
+
+        self._setup(
+            plan, sources, derivations, DerivationGraph(derivations), max_workers
+        )
+
+        if cached is not None:
+            self._partials = cached["partials"]
+            base = cached["base"]
+            layers = (("defaults", self._defaults),)
+            layers += tuple(zip(self._sources, self._partials))
+            config, deferred = self._defer_sources(
+                self._derivation_graph.derive(base), layers
+            )
+            self._snapshot = Snapshot(
+                config, generation=1, base=base, layers=layers, deferred=deferred
+            )
+        elif not skip_load_on_init:
             self.update_config()
+            if fingerprint is not None:
+                cache.store(
+                    fingerprint,
+                    defaults=self._defaults,
+                    partials=self._partials,
+                    base=self._snapshot._base,
+                )
+
+    def _setup(
+        self, plan, sources, derivations, derivation_graph, max_workers, parent=None
+    ):
+        """Set up the state shared by `__init__` and `override`.
 
-    def update_config(self):
+        Parameters
+        ----------
+        plan : SchemaPlan
+            The compiled schema
+        sources : list
+            Sources of this Conifer
+        derivations : dict
+            Dict of derivation functions
+        derivation_graph : DerivationGraph
+            Compiled derivations
+        max_workers : int
+            Threads to load sources on, see `Conifer`
+        parent : Conifer
+            The Conifer this one overrides, see `override`
+        """
+        self._schema = plan.schema
+        # Compiled once, shared by all sources and every reload
+        self._plan = plan
+        # Built on first use, see `_validator`
+        self._schema_validator = None
+        # (prefix, callback) of subscribers, replaced whole on change, see `subscribe`
+        self._subscribers = ()
+        self._subscribers_lock = threading.Lock()
+        # ChangeSets to notify subscribers of, in the order they were published
+        self._notifications = deque()
+        # Held by the thread notifying subscribers, see `_notify`
+        self._notify_lock = threading.Lock()
+        # The Conifer this one overrides
+        self._parent = parent
+        # Snapshot with overrides for the current context, see `scoped`
+        self._scoped = _context_var("conifer_scoped")
+
+        self._sources = sources
+        # The last configuration loaded from each source, in the same order
+        self._partials = [None] * len(self._sources)
+        # Serializes reloads, which may come from other threads (eg. a ConfigWatcher)
+        self._update_lock = threading.Lock()
+        self._max_workers = max_workers
+        # Thread pool for loading sources concurrently, created on first use
+        self._executor = None
+
+        self._derivations = derivations
+        # Compiled once, remembers derived values between reloads
+        self._derivation_graph = derivation_graph
+        # The key prefixes of each lazy source, see "Lazy sources"
+        self._provides = _lazy_prefixes(self._sources, self._derivation_graph)
+
+    def update_config(self, sources=None):
         """Load or re-load configuration from defined sources.
 
         Called in __init__, but can be called at any time to reload all configuration.
 
+        Parameters
+        ----------
+        sources : list
+            Only re-load these sources, which must be some of this Conifer's sources.
+            The last loaded configuration of every other source is re-used.
+            Defaults to all sources, except lazy sources which weren't loaded yet.
+
+        Returns
+        -------
+        ChangeSet
+            The configuration values which changed, see `conifer.changes.ChangeSet`
+
         Side Effects
         ------------
-        modifies self._config
+        Publishes a new Snapshot. The configuration is built and validated before being
+        swapped in with a single assignment, so readers never see a partial update and
+        never need a lock. Then notifies subscribers of changed values, see `subscribe`.
+        """
+        with self._update_lock:
+            indexes = self._indexes_to_load(sources)
+            loaded = self._load_sources([self._sources[index] for index in indexes])
+            changes = self._publish(indexes, loaded)
+        self._notify()
+        return changes
+
+    def subscribe(self, prefix, callback):
+        """Call callback after each reload which changed values at or below prefix.
+
+            >>> conf.subscribe('db.', lambda changes: pool.reconnect(changes.new.db))
+
+        Callbacks are called after the new Snapshot is published, in the order they
+        subscribed. Changes are notified in the order they were published, one ChangeSet
+        at a time: usually by the thread reloading, but if another thread is notifying
+        subscribers when a reload publishes, that thread notifies of its changes too, and
+        the reload returns without waiting for it. The same goes for reloads by the
+        callbacks themselves. An exception raised by a callback is re-raised from the
+        reload notifying of the changes, once all other callbacks were called.
+
+        Parameters
+        ----------
+        prefix : str or list
+            Dotted key path like 'db.' or 'db.host', or a list of keys. '' subscribes to
+            all changes.
+        callback : callable
+            Called with the ChangeSet of only the changes at or below prefix
+
+        Returns
+        -------
+        callable
+            Call it to unsubscribe
         """
-        new_config = _update_config(
-            self._config, self._schema, self._sources, self._derivations
+        subscription = (as_prefix(prefix), callback)
+        with self._subscribers_lock:
+            self._subscribers = self._subscribers + (subscription,)
+
+        def unsubscribe():
+            with self._subscribers_lock:
+                self._subscribers = tuple(
+                    other for other in self._subscribers if other is not subscription
+                )
+
+        return unsubscribe
+
+    def _notify(self):
+        """Call the subscribers to the published changes, see `subscribe`.
+
+        Returns right away if another thread is notifying subscribers, as it notifies of
+        all changes published meanwhile, in order.
+        """
+        error = None
+        while self._notifications:
+            if not self._notify_lock.acquire(False):
+                break
+            try:
+                while self._notifications:
+                    changes = self._notifications.popleft()
+                    for prefix, callback in self._subscribers:
+                        subtree_changes = changes.under(prefix)
+                        if subtree_changes:
+                            try:
+                                callback(subtree_changes)
+                            except Exception as callback_error:
+                                error = error or callback_error
+            finally:
+                self._notify_lock.release()
+            # changes may have been published just before the lock was released
+        if error is not None:
+            raise error
+
+    def update_config_async(self, sources=None):
+        """Load or re-load configuration without blocking the event loop.
+
+        Coroutine version of `update_config`. Sources defining a coroutine method
+        `load_config_async(schema)` are awaited; other sources are loaded on the event
+        loop's default executor. All sources load concurrently, and are merged in the order
+        of this Conifer's sources. Returns the ChangeSet, like `update_config`.
+
+            >>> changes = await conf.update_config_async()
+        """
+        from ._async import update_config_async
+
+        return update_config_async(self, sources)
+
+    def start_refresher(self, interval=30.0, jitter=0.1, **kwargs):
+        """Reload configuration every interval seconds in a background daemon thread.
+
+        Failed reloads back off exponentially while the last good configuration keeps being
+        served. See `conifer.refresh.Refresher` for all options.
+
+        Returns
+        -------
+        Refresher
+            The running refresher, call `stop()` to stop refreshing. Its `stats` attribute
+            counts refreshes, failures and their latency.
+        """
+        from .refresh import Refresher
+
+        refresher = Refresher(self, interval=interval, jitter=jitter, **kwargs)
+        refresher.start()
+        return refresher
+
+    def publish(self, path):
+        """Publish the current Snapshot to a file, for other processes to read.
+
+        Other processes, eg. the workers of a pre-fork server, read it with
+        `conifer.shared.SharedConfig(path)` without loading any sources. Call `publish`
+        again after each `update_config` to share the new configuration.
+
+        Parameters
+        ----------
+        path : str
+            File to publish to, replaced atomically
+
+        Returns
+        -------
+        int
+            Generation of the published Snapshot
+        """
+        from .shared import publish_snapshot
+
+        snapshot = self._snapshot
+        publish_snapshot(snapshot, path)
+        return snapshot.generation
+
+    def _indexes_to_load(self, sources):
+        """Return the indexes of the sources to load for `update_config(sources)`."""
+        deferred = self._deferred_indexes()
+        indexes = []
+        for index, source in enumerate(self._sources):
+            if sources is not None and any(
+                source is reload_source for reload_source in sources
+            ):
+                indexes.append(index)
+            elif index in deferred:
+                continue
+            elif sources is None or self._partials[index] is None:
+                indexes.append(index)
+        return indexes
+
+    def _deferred_indexes(self, paths=None, partials=None):
+        """Return the indexes of the lazy sources which weren't loaded yet.
+
+        If paths are passed, only those providing a value at, above or below any of them.
+        Sources are loaded if they have partials, which default to the current ones.
+        """
+        if partials is None:
+            partials = self._partials
+        return [
+            index
+            for index, prefixes in enumerate(self._provides)
+            if prefixes is not None
+            and partials[index] is None
+            and (
+                paths is None
+                or any(overlaps(path, prefix) for path in paths for prefix in prefixes)
+            )
+        ]
+
+    def _load_deferred_at(self, paths):
+        """Load the lazy sources providing values at, above or below any of paths.
+
+        Includes those of the Conifer this one overrides, which is then re-based on the
+        parent's new Snapshot.
+        """
+        self._load_deferred(self._deferred_indexes(paths))
+        parent = self._snapshot._layers[0][0]
+        if isinstance(parent, Snapshot) and any(
+            overlaps(path, prefix) for path in paths for prefix in parent._deferred
+        ):
+            self._parent._load_deferred_at(paths)
+            self.update_config(sources=[])
+
+    def _load_deferred(self, indexes):
+        """Load the lazy sources at indexes, unless another thread already loaded them."""
+        if not indexes:
+            return
+        with self._update_lock:
+            indexes = [index for index in indexes if self._partials[index] is None]
+            if not indexes:
+                return
+            loaded = self._load_sources([self._sources[index] for index in indexes])
+            self._publish(indexes, loaded)
+        self._notify()
+
+    def _defer_sources(self, config, layers):
+        """Return config with the values of lazy sources not loaded yet replaced.
+
+        Each prefix they provide is replaced by a lazy value loading them on first access,
+        see `LazyDict`. Only the dicts along those prefixes are copied; config itself must
+        be a new dict, and is converted to a LazyDict if it isn't one.
+
+        layers are the (source, configuration) merged into config, see `Snapshot`. On
+        access, the lazy sources' configuration is merged with them, so config stays
+        consistent however much the Conifer was reloaded since. Prefixes the Snapshot of
+        the Conifer this one overrides defers stay deferred too, and are read from it.
+
+        Returns
+        -------
+        (dict, tuple)
+            config, and the prefixes deferred in it
+        """
+        partials = [layer for _, layer in layers[1 : len(self._sources) + 1]]
+        by_prefix = {}
+        parent = layers[0][0]
+        if isinstance(parent, Snapshot):
+            for prefix in parent._deferred:
+                by_prefix[prefix] = set()
+        for index in self._deferred_indexes(partials=partials):
+            for prefix in self._provides[index]:
+                by_prefix.setdefault(prefix, set()).add(index)
+        if not by_prefix:
+            return config, ()
+
+        if not isinstance(config, LazyDict):
+            config = _as_lazy_dict(config)
+        # outer prefixes load the sources of the prefixes inside them too
+        installed = []
+        for prefix in sorted(by_prefix, key=len):
+            if not any(overlaps(prefix, outer) for outer in installed):
+                installed.append(prefix)
+        for prefix in installed:
+            indexes = set()
+            for other, other_indexes in by_prefix.items():
+                if overlaps(other, prefix):
+                    indexes.update(other_indexes)
+            parent = config
+            for part in prefix[:-1]:
+                child = dict.get(parent, part)
+                if isinstance(child, LazyDict):
+                    child = _copy_lazy_dict(child)
+                else:
+                    child = _as_lazy_dict(child if isinstance(child, dict) else {})
+                dict.__setitem__(parent, part, child)
+                parent = child
+            dict.pop(parent, prefix[-1], None)
+            parent._lazy[prefix[-1]] = _DeferredSources(
+                self, sorted(indexes), prefix, layers
+            )
+        return config, tuple(installed)
+
+    def _load_sources(self, sources):
+        """Return the configuration loaded from each of sources, in the same order."""
+        if self._max_workers is None or len(sources) < 2:
+            return [source.load_config(self._plan) for source in sources]
+
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+        return list(
+            self._executor.map(lambda source: source.load_config(self._plan), sources)
         )
-        self._validator.validate(new_config)
-        recursive_update(self._config, new_config)
+
+    def close(self):
+        """Shut down the thread pool loading sources concurrently, see `max_workers`.
+
+        The Conifer stays usable: a later reload starts a new thread pool if it needs one.
+        """
+        with self._update_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _publish(self, indexes, loaded):
+        """Merge newly loaded configuration and publish it as a new Snapshot.
+
+        Caller must hold the update lock, and call `_notify` once it is released.
+
+        Returns
+        -------
+        ChangeSet
+        """
+        partials = list(self._partials)
+        for index, partial_config in zip(indexes, loaded):
+            partials[index] = partial_config
+
+        if self._parent is None:
+            # the defaults of the initial snapshot were never validated
+            previous = self._snapshot._base if self._snapshot.generation else None
+            paths = self._changed_source_paths(indexes, partials)
+            if previous is not None and paths is not None:
+                # only re-merge what the reloaded sources changed
+                base = merge_paths([self._defaults] + partials, previous, paths)
+            else:
+                base = _merge_sources(self._defaults, partials, self._snapshot._base)
+            first_layer = ("defaults", self._defaults)
+        else:
+            # copy-on-write layer over the parent's latest snapshot
+            parent = self._parent._snapshot
+            previous = parent._base
+            base = merge_layers([previous] + partials, previous)
+            first_layer = (parent, previous)
+        self._validate(base, previous)
+
+        layers = (first_layer,) + tuple(zip(self._sources, partials))
+        new_config, deferred = self._defer_sources(
+            self._derivation_graph.derive(base), layers
+        )
+        old = self._snapshot
+        new = Snapshot(
+            new_config,
+            old.generation + 1,
+            base=base,
+            layers=layers,
+            deferred=deferred,
+            previous=old,
+        )
+        self._partials = partials
+        self._snapshot = new
+        changes = ChangeSet(old, new)
+        if changes:
+            self._notifications.append(changes)
+        return changes
+
+    def _changed_source_paths(self, indexes, partials):
+        """Return the paths where the sources at indexes changed their configuration.
+
+        Returns None if they changed too much to re-merge only those paths, or weren't
+        loaded before.
+        """
+        paths = []
+        for index in indexes:
+            old = self._partials[index]
+            if old is None:
+                if self._provides[index] is None:
+                    return None
+                # lazy sources didn't provide any values before they were loaded
+                old = {}
+            paths.extend(changed_paths(old, partials[index] or {}))
+            if len(paths) > _MAX_INCREMENTAL_PATHS:
+                return None
+        return paths
+
+    def _validate(self, config, previous=None):
+        """Validate config, only checking what changed since the valid config previous.
+
+        Only the subtrees which differ from previous are validated against their
+        subschemas, unless a cross-key constraint (eg. `required` on an ancestor) could be
+        affected, or too much changed. Then the whole config is validated.
+        """
+        if previous is not None:
+            paths = changed_paths(previous, config)
+            if len(paths) <= _MAX_INCREMENTAL_PATHS:
+                targets = _validation_targets(self._schema, paths)
+                if targets is not None:
+                    for path, subschema in targets:
+                        try:
+                            value = get_in(config, path)
+                        except KeyError:
+                            # deleted, and nothing constrains its parent as a whole
+                            continue
+                        _descend(self._validator, subschema).validate(value)
+                    return
+
+        from .validation import compile_validator
+
+        # memoized for each schema, so shared with overrides
+        compile_validator(self._schema).validate(config)
+
+    def watch(self, debounce=0.1, poll_interval=1.0):
+        """Reload configuration whenever the files behind this Conifer's sources change.
+
+        Starts a background ConfigWatcher, see `conifer.watch.ConfigWatcher`.
+
+        Parameters
+        ----------
+        debounce : float
+            Seconds to wait for a burst of file changes to settle before reloading
+        poll_interval : float
+            Seconds between checks when inotify is not available and files are polled
+
+        Returns
+        -------
+        ConfigWatcher
+            The running watcher, call `stop()` to stop watching
+        """
+        from .watch import ConfigWatcher
+
+        watcher = ConfigWatcher(self, debounce=debounce, poll_interval=poll_interval)
+        watcher.start()
+        return watcher
 
     def override(self, sources=None):
         """Create a new Conifer with additional overrides from provided sources
 
         Does not modify passed conf instance.
 
+        The new Conifer is a thin copy-on-write layer over this Conifer's current snapshot:
+        only the dicts holding overridden keys are copied, everything else is shared, and
+        only the overridden sections are validated again. Derivations whose parameters
+        aren't overridden re-use this Conifer's derived values. Lazy sources of this
+        Conifer which weren't loaded yet are loaded when the new Conifer reads their keys.
+        Calling `update_config` on the new Conifer re-loads its sources on top of this
+        Conifer's latest snapshot.
+
         Parameters
         ----------
         sources : list
-            List of instantiated loader classes
-        derivations : dict
-            Dict of derivations
+            List of instantiated loader classes. Defaults to an EnvironmentConfigLoader.
 
         Returns
         -------
         Conifer
         """
-        new_conf = Conifer(
-            self._schema,
-            sources=sources,
-            derivations=self._derivations,
-            initial_config=self._config,
+        if sources is None:
+            sources = [EnvironmentConfigLoader()]
+        new_conf = Conifer.__new__(Conifer)
+        new_conf._setup(
+            self._plan,
+            sources,
+            self._derivations,
+            self._derivation_graph.copy(),
+            self._max_workers,
+            parent=self,
         )
+        new_conf._defaults = None
+        new_conf._snapshot = self._snapshot
+        new_conf.update_config()
         return new_conf
 
+    @property
+    def plan(self):
+        """The compiled SchemaPlan shared by all of this Conifer's sources."""
+        return self._plan
+
+    @property
+    def _validator(self):
+        """Draft4Validator for the whole schema, built on first use.
+
+        Overrides share the validator of the Conifer they override.
+        """
+        if self._parent is not None:
+            return self._parent._validator
+        if self._schema_validator is None:
+            from jsonschema import Draft4Validator
+
+            self._schema_validator = Draft4Validator(self._schema)
+        return self._schema_validator
+
+    @property
+    def _config(self):
+        """The populated configuration data of the current snapshot, a plain dict."""
+        return (self._scoped.get() or self._snapshot)._config
+
+    def snapshot(self):
+        """Return the current Snapshot of the configuration.
+
+        The Snapshot is never modified by reloads, so holding on to it gives a consistent
+        view of the configuration, eg. for the lifetime of a request.
+        Inside `scoped`, this is the Snapshot including the scoped overrides.
+        """
+        return self._scoped.get() or self._snapshot
+
+    def scoped(self, overrides):
+        """Override configuration values for the current context only.
+
+        Returns a context manager, usable with `with` or `async with`. Inside it, all reads
+        from this Conifer in the same thread or asyncio task see the overrides. Other
+        threads and tasks are unaffected. Scopes may be nested.
+
+            >>> with conf.scoped({'http': {'timeout': 5}}):
+            ...     handle_request()
+
+        Only the dicts along overridden keys are copied, and derivations are only evaluated
+        again if their parameters are overridden, so entering a scope is cheap. The scope
+        is based on the snapshot current when it is entered, and doesn't see later reloads.
+
+        Parameters
+        ----------
+        overrides : dict
+            Nested dict of values to override. Values are coerced and validated like values
+            from other sources. Every overridden key must be defined by the schema.
+
+        Raises
+        ------
+        KeyError
+            If an overridden key is not defined by the schema
+        """
+        from .scoped import ScopedOverride
+
+        return ScopedOverride(self, overrides)
+
     def __getitem__(self, key):
-        return self._config[key]
+        snapshot = self._scoped.get() or self._snapshot
+        view = snapshot._view
+        if view is None:
+            view = snapshot._attrs()
+        return view[key]
 
     def __getattr__(self, key):
-        return _AttrDict(self._config).__getattr__(key)
+        snapshot = self._scoped.get() or self._snapshot
+        view = snapshot._view
+        if view is None:
+            view = snapshot._attrs()
+        return getattr(view, key)
 
     def get(self, key, default=None):
         """Get value, default, or None."""
+        return (self._scoped.get() or self._snapshot).get(key, default)
+
+    def get_in(self, key, default=None):
+        """Get maybe-nested value, default, or None."""
+        return (self._scoped.get() or self._snapshot).get_in(key, default)
+
+    def as_dict(self):
+        """Return plain config dictionary, including all lazily derived values."""
+        return (self._scoped.get() or self._snapshot).as_dict()
+
+    def explain(self, key):
+        """Return where the current value of key came from.
+
+            >>> conf.explain('db.host')
+            Provenance(path=('db', 'host'), value='localhost', source=<JSONFileLoader ...>)
+
+        The first lookup after a reload indexes which source set each value; later ones
+        are a dict lookup.
+
+        Parameters
+        ----------
+        key : str or list
+            Dotted key path like 'db.host', or a list of keys
+
+        Returns
+        -------
+        Provenance
+            Named tuple of the key's `path`, `value` and `source`. The source is the
+            source object whose configuration set the value, or 'defaults' for schema
+            defaults and `initial_config`, 'derivation' for derived values, or 'scoped'
+            for values overridden by `scoped`.
+
+        Raises
+        ------
+        KeyError
+            If key has no value, or holds nested values
+        """
+        self._load_deferred_at([as_prefix(key)])
+        return (self._scoped.get() or self._snapshot).explain(key)
+
+    def handle(self, key):
+        """Return a KeyHandle reading the current value of key.
+
+        The key is parsed and checked against the schema and derivations once, so handles
+        are cheap to call in hot paths, and can be held across reloads.
+
+        Parameters
+        ----------
+        key : str or list
+            Dotted path, eg. 'db.pool.size', or list of nested keys, eg. ['db', 'pool', 'size']
+
+        Raises
+        ------
+        KeyError
+            If key is not defined by the schema or derivations
+        """
+        if isinstance(key, str):
+            path = tuple(key.split("."))
+        else:
+            path = tuple(key)
+
+        plan = self._plan
+        derivations = self._derivation_graph
+        if not (
+            path in plan.by_path
+            or path in plan.sections
+            or path in derivations.keys
+            or path in derivations.sections
+        ):
+            raise KeyError("{} is not defined by the schema or derivations".format(key))
+
+        return KeyHandle(self, path)
+
+
+class KeyHandle(object):
+    """Bound accessor for one maybe-nested key of a Conifer, see `Conifer.handle`.
+
+    Calling the handle returns the key's value in the Conifer's current snapshot.
+    """
+
+    __slots__ = ("_conf", "path")
+
+    def __init__(self, conf, path):
+        self._conf = conf
+        self.path = path
+
+    def __call__(self, default=_MISSING):
+        conf = self._conf
+        snapshot = conf._scoped.get() or conf._snapshot
+        value = snapshot._view
+        if value is None:
+            value = snapshot._attrs()
         try:
-            return self.__getitem__(key)
+            for part in self.path:
+                value = value[part]
         except KeyError:
+            if default is _MISSING:
+                raise
             return default
+        return value
+
+    def __repr__(self):
+        return "KeyHandle({!r})".format(".".join(self.path))
+
+
+class Snapshot(object):
+    """The configuration of a Conifer at one point in time.
+
+    Snapshots are published whole by `Conifer.update_config` and never modified afterwards,
+    so all reads from one Snapshot are consistent with each other. The dicts and lists
+    returned from a Snapshot are read-only, since they share their values with other
+    Snapshots; modifying them raises TypeError. Use `as_dict` for a modifiable copy.
+
+    Attributes
+    ----------
+    generation : int
+        Incremented each time the Conifer publishes a new Snapshot
+    """
+
+    __slots__ = (
+        "_config",
+        "generation",
+        "_view",
+        "_reuse",
+        "_base",
+        "_layers",
+        "_provenance",
+        "_deferred",
+    )
+
+    def __init__(
+        self, config, generation, base=None, layers=(), deferred=(), previous=None
+    ):
+        self._config = config
+        self.generation = generation
+        # The _AttrDict of config, built on first use, see `_attrs`
+        self._view = None
+        # The latest _AttrDict built for an earlier Snapshot, whose views of the subtrees
+        # config shares with it are re-used
+        self._reuse = None
+        if previous is not None:
+            self._reuse = (
+                previous._view if previous._view is not None else previous._reuse
+            )
+        # The merged configuration of all sources, before derivations
+        self._base = config if base is None else base
+        # (source, configuration) merged into base, in order, see `explain`
+        self._layers = layers
+        # Maps key paths to the index of the layer setting them, built on first use
+        self._provenance = None
+        # Key prefixes whose lazy sources weren't loaded yet, see `Conifer._defer_sources`
+        self._deferred = deferred
+
+    def __getitem__(self, key):
+        view = self._view
+        if view is None:
+            view = self._attrs()
+        return view[key]
+
+    def __contains__(self, key):
+        return key in self._attrs()
+
+    def __getattr__(self, key):
+        view = self._view
+        if view is None:
+            view = self._attrs()
+        return getattr(view, key)
+
+    def _attrs(self):
+        """Return the _AttrDict of the configuration, building it on first use."""
+        view = self._view
+        if view is None:
+            view = self._view = _AttrDict(self._config, self._reuse)
+            self._reuse = None
+        return view
+
+    def get(self, key, default=None):
+        """Get value, default, or None."""
+        return self._attrs().get(key, default)
 
     def get_in(self, key, default=None):
+        """Get maybe-nested value, default, or None."""
         try:
-            get_in(self._config, key)
+            return get_in(self._attrs(), key)
         except KeyError:
             return default
 
     def as_dict(self):
-        """Return plain config dictionary."""
-        return self._config
+        """Return plain config dictionary, including all lazily derived values.
+
+        The dictionary is a deep copy, so it may be modified without affecting the
+        Snapshot, which shares its values with other Snapshots.
+        """
+        return deepcopy(materialize(self._config))
+
+    def explain(self, key):
+        """Return where the value of key came from, see `Conifer.explain`."""
+        path = as_prefix(key)
+        try:
+            value = get_in(self._base, path)
+        except (KeyError, TypeError):
+            # derived values are added after merging
+            value = get_in(self._attrs(), path)
+            return Provenance(path, value, "derivation")
+        if isinstance(value, Mapping) and value:
+            raise KeyError(
+                "{} holds nested values, explain one of them".format(".".join(path))
+            )
+
+        if self._provenance is None:
+            self._provenance = _provenance_index(self._layers)
+        source = self._layers[self._provenance[path]][0]
+        if isinstance(source, Snapshot):
+            # from the Conifer this one overrides
+            return source.explain(path)
+        return Provenance(path, _read_only(value), source)
+
+
+# Where a configuration value came from, see `Conifer.explain`
+Provenance = namedtuple("Provenance", ["path", "value", "source"])
+
+
+def _provenance_index(layers):
+    """Map the key path of every value set by layers to the last layer setting it.
+
+    Paths are only looked up if they are set in the merged configuration, whose values are
+    always those of the last layer setting them.
+    """
+    index = {}
+    for position, (_, layer) in enumerate(layers):
+        stack = [((), layer or {})]
+        while stack:
+            prefix, dic = stack.pop()
+            for key, value in dic.items():
+                path = prefix + (key,)
+                if isinstance(value, Mapping) and value:
+                    stack.append((path, value))
+                else:
+                    index[path] = position
+    return index
 
 
 class _AttrDict(dict):
-    """Dict with mild overrides so we can use keys as attributes."""
+    """Read-only dict of a configuration subtree, whose keys can also be read as attributes.
 
-    _dict = None
+    Holds the subtree's values, with nested dicts replaced by their own _AttrDicts, and
+    lists by `_ReadOnlyList`s, so modifying them raises TypeError. Each is
+    built once per subtree of a Snapshot, on first access, rather than on every access.
+    Subtrees a Snapshot shares with an earlier one share their _AttrDicts too, so only the
+    changed ones are built again after a reload. Lazy values of a `LazyDict` subtree are
+    read through to it on first access. Values read as attributes are cached in the
+    instance's `__dict__`, so reading them again is a plain attribute lookup.
 
-    def __init__(self, dic):
-        super(_AttrDict, self).__init__(dic)
+    Parameters
+    ----------
+    dic : dict
+        The subtree
+    previous : _AttrDict
+        The _AttrDict of the subtree at the same path in an earlier Snapshot, if any
+    """
+
+    def __init__(self, dic, previous=None):
+        super(_AttrDict, self).__init__()
         self._dict = dic
+        for key, value in dict.items(dic):
+            if isinstance(value, (dict, list)):
+                if previous is not None:
+                    value = _read_only(value, dict.get(previous, key))
+                else:
+                    value = _read_only(value)
+            dict.__setitem__(self, key, value)
+
+    def __missing__(self, key):
+        # raises KeyError if undefined, evaluates lazy values
+        value = _read_only(self._dict[key])
+        dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
 
     def __getattr__(self, key):
-        value = self._dict.get(key)
+        if key.startswith("__") or key == "_dict":
+            # not config; also avoids recursing on an unset slot, eg. when copying
+            raise AttributeError(key)
+
+        value = self.get(key)
         if value is None:
             raise AttributeError(
                 "{self} object has no such attribute {key}".format(**locals())
             )
+        # cached as an instance attribute, so reading it again is a plain lookup
+        self.__dict__[key] = value
+        return value
 
-        if isinstance(value, dict):
-            return _AttrDict(value)
+    def __reduce_ex__(self, protocol):
+        return (dict, (dict(self),))
 
-        return value
+    def _modify(self, *args, **kwargs):
+        raise TypeError("Configuration is read-only, modify a copy from as_dict()")
 
+    __setitem__ = __delitem__ = __ior__ = _modify
+    clear = pop = popitem = setdefault = update = _modify
 
-def _iter_derivations(derivations):
-    """Walk through derivations which may be nested.
 
-    Return (['nested', 'key'], value).
-    """
-    if derivations is not None:
-        for key, value in derivations.items():
-            if "derivation" not in value:
-                for subkey, sub_value in _iter_derivations(value):
-                    yield ([key] + subkey, sub_value)
-            else:
-                yield ([key], value)
+class _ReadOnlyList(list):
+    """Read-only list of configuration values, see `_AttrDict`."""
 
+    __slots__ = ("_list",)
 
-def _derive_values(config, derivations):
-    """Use derivation rules to determine derived config values."""
-    derived_config = {}
-    for key, value in _iter_derivations(derivations):
-        param_keys = value["parameters"]
-        try:
-            params = [get_in(config, param_key) for param_key in param_keys]
-        except KeyError:
-            # If key is not defined, don't try to derive a value
-            continue
-        else:
-            result = value["derivation"](*params)
-            set_in(derived_config, key, result)
+    def __init__(self, values):
+        super(_ReadOnlyList, self).__init__(_read_only(value) for value in values)
+        self._list = values
+
+    def __reduce_ex__(self, protocol):
+        return (list, (list(self),))
 
-    return derived_config
+    _modify = _AttrDict.__dict__["_modify"]
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _modify
+    # py2
+    __setslice__ = __delslice__ = _modify
+    append = extend = insert = pop = remove = reverse = sort = clear = _modify
+
+
+def _read_only(value, previous=None):
+    """Return value, with dicts and lists made read-only, see `_AttrDict`.
+
+    previous is the read-only value at the same path in an earlier Snapshot, which is
+    re-used if it is of the same dict or list, or its subtrees are if it is an _AttrDict.
+    """
+    if isinstance(value, dict):
+        if not isinstance(previous, _AttrDict):
+            return _AttrDict(value)
+        if previous._dict is value:
+            return previous
+        return _AttrDict(value, previous)
+    if isinstance(value, list):
+        if isinstance(previous, _ReadOnlyList) and previous._list is value:
+            return previous
+        return _ReadOnlyList(value)
+    return value
 
 
 def _extend_with_default(validator_class):
@@ -231,39 +1145,228 @@ def _extend_with_default(validator_class):
         for error in validate_properties(validator, properties, instance, schema):
             yield error
 
+    from jsonschema import validators
+
     return validators.extend(validator_class, {"properties": set_defaults})
 
 
-def _update_config(existing_config, schema, sources, derivations):
-    """Gather configuration and derived values from sources.
+class _DeferredSources(object):
+    """Loads lazy sources on first access to a prefix they provide, see `LazyDict`.
 
-    Derived values must include the existing configuration, but
-    we don't want to modify the class's config in this method in order
-    to make the class method atomic.
+    The value at prefix is merged from the layers of the Snapshot holding it, with the
+    configuration of the lazy sources, so it doesn't include later reloads.
     """
-    config = deepcopy(existing_config)
 
+    __slots__ = ("conf", "indexes", "prefix", "layers")
+
+    def __init__(self, conf, indexes, prefix, layers):
+        self.conf = conf
+        self.indexes = indexes
+        self.prefix = prefix
+        self.layers = layers
+
+    def evaluate(self):
+        conf = self.conf
+        conf._load_deferred(self.indexes)
+
+        values = []
+        for position, (source, layer) in enumerate(self.layers):
+            if position - 1 in self.indexes:
+                # the source follows the first layer
+                layer = conf._partials[position - 1]
+            elif isinstance(source, Snapshot):
+                layer = source._config
+            try:
+                values.append({"value": get_in(layer, self.prefix)})
+            except (KeyError, TypeError):
+                continue
+        if not values:
+            raise KeyError(self.prefix[-1])
+        return merge_layers(values)["value"]
+
+
+def _lazy_prefixes(sources, derivations):
+    """Return the key prefixes provided by each of sources, or None if it isn't lazy.
+
+    Sources are only lazy if no non-lazy derivation depends on the keys they provide,
+    since those are evaluated on every reload, and no derivation sets them.
+    """
+    lazy_prefixes = []
     for source in sources:
-        new_data = source.load_config(schema)
-        recursive_update(config, new_data)
+        provides = getattr(source, "provides", None)
+        if provides is not None:
+            provides = tuple(as_prefix(prefix) for prefix in provides)
+            if derivations.depends_on_any(provides, lazy=False) or any(
+                overlaps(key, prefix) for key in derivations.keys for prefix in provides
+            ):
+                provides = None
+        lazy_prefixes.append(provides)
+    return lazy_prefixes
 
-    derived_values = _derive_values(config, derivations)
-    recursive_update(config, derived_values)
 
-    return config
+def _copy_lazy_dict(lazy_dict):
+    """Copy a LazyDict, including the lazy values it didn't evaluate yet."""
+    copy = _as_lazy_dict(lazy_dict)
+    copy._lazy.update(lazy_dict._lazy)
+    return copy
+
+
+def _merge_sources(defaults, partials, previous=None):
+    """Merge configuration loaded from sources on top of defaults.
+
+    Neither defaults nor partials are modified, so the merge is atomic. Subtrees equal to
+    those of the previous config are shared with it, see `utils.merge_layers`.
+    """
+    return merge_layers([defaults] + list(partials), previous)
+
+
+def _validation_targets(schema, paths):
+    """Return [(path, subschema)] to validate after the values at paths changed.
+
+    A changed value is validated against its own subschema, unless an ancestor object's
+    schema has keywords constraining it as a whole, in which case the highest such
+    ancestor is validated instead. Values no schema constrains need no validation.
+
+    Returns None if the whole config must be validated.
+    """
+    targets = {}
+    for path in paths:
+        target = _validation_target(schema, path)
+        if target is None:
+            return None
+        if target is not False:
+            targets[target[0]] = target[1]
+
+    # validating an ancestor also validates everything below it
+    return [
+        (path, subschema)
+        for path, subschema in targets.items()
+        if not any(path[:index] in targets for index in range(len(path)))
+    ]
+
+
+def _validation_target(schema, path):
+    """Return (path, subschema) to validate for a change at path, see above.
+
+    Returns None if the whole config must be validated, or False if nothing must be.
+    """
+    node = schema
+    for depth, key in enumerate(path):
+        node = _resolve_local_ref(schema, node)
+        if node is None:
+            return None
+        if _WHOLE_OBJECT_KEYWORDS.intersection(node):
+            return (path[:depth], node) if depth else None
+        properties = node.get("properties", {})
+        if key not in properties:
+            return False
+        node = properties[key]
+    return path, node
+
+
+def _resolve_local_ref(schema, node):
+    """Return node with its local `$ref` resolved, or None for a remote `$ref`."""
+    while "$ref" in node:
+        ref = node["$ref"]
+        if not ref.startswith("#"):
+            return None
+        node = resolve_pointer(schema, ref)
+    return node
+
+
+def _descend(validator, subschema):
+    """Return a validator for subschema, resolving `$ref`s like validator does."""
+    evolve = getattr(validator, "evolve", None)
+    if evolve is not None:
+        return evolve(schema=subschema)
+    # jsonschema < 4
+    return type(validator)(subschema, resolver=validator.resolver)
+
+
+# Keywords constraining an object as a whole, rather than one property at a time
+_WHOLE_OBJECT_KEYWORDS = frozenset(
+    [
+        "additionalProperties",
+        "allOf",
+        "anyOf",
+        "dependencies",
+        "enum",
+        "maxProperties",
+        "minProperties",
+        "not",
+        "oneOf",
+        "patternProperties",
+        "required",
+    ]
+)
+
+# Most changed paths to validate one at a time, see `Conifer._validate`
+_MAX_INCREMENTAL_PATHS = 32
+
+
+def _context_var(name):
+    """Return a ContextVar defaulting to None, or a thread local equivalent before py3.7."""
+    try:
+        from contextvars import ContextVar
+    except ImportError:
+        return _ThreadLocalVar()
+    return ContextVar(name, default=None)
+
+
+class _ThreadLocalVar(threading.local):
+    """Minimal thread local stand-in for contextvars.ContextVar."""
+
+    value = None
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        token = self.value
+        self.value = value
+        return token
+
+    def reset(self, token):
+        self.value = token
 
 
 def _validate_schema(schema):
-    """Helper function to validate that the schema is itself valid."""
-    schema = thaw(schema)
-    schema_path = os.path.join(
-        os.path.dirname(os.path.realpath(__file__)), "json-schema.json"
-    )
-    with open(schema_path, "rb") as schema_file:
-        json_schema = json.load(schema_file)
+    """Helper function to validate that the schema is itself valid.
+
+    schema must be frozen. Valid schemas are remembered, so validating an equal schema
+    again is only a hash lookup.
+    """
+    if schema in _valid_schemas:
+        return
+
+    from pyrsistent import thaw
 
-    validator = Draft4Validator(json_schema)
-    validator.validate(schema)
+    thawed = thaw(schema)
+    _metaschema_validator().validate(thawed)
 
-    if "properties" not in schema:
+    if "properties" not in thawed:
         raise ValueError("Invalid schema: must have `properties` key")
+
+    if len(_valid_schemas) >= _VALID_SCHEMAS_SIZE:
+        _valid_schemas.clear()
+    _valid_schemas.add(schema)
+
+
+def _metaschema_validator():
+    """Return the validator for the JSON Schema metaschema, loaded once per process."""
+    global _METASCHEMA_VALIDATOR
+    if _METASCHEMA_VALIDATOR is None:
+        from jsonschema import Draft4Validator
+
+        schema_path = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), "json-schema.json"
+        )
+        with open(schema_path, "rb") as schema_file:
+            _METASCHEMA_VALIDATOR = Draft4Validator(json.load(schema_file))
+    return _METASCHEMA_VALIDATOR
+
+
+_METASCHEMA_VALIDATOR = None
+# Frozen schemas which passed `_validate_schema`
+_valid_schemas = set()
+_VALID_SCHEMAS_SIZE = 128
@@ -0,0 +1,353 @@
+"""Derivations module for Conifer
+
+Derivations are compiled into a `DerivationGraph`: a dependency graph keyed on the
+`parameters` paths of each derivation. Derivations may depend on the values of other
+derivations, and are evaluated in dependency order. On reload, only derivations whose
+parameter values changed are evaluated again.
+
+Derivations with `'lazy': True` are not evaluated on reload at all. Instead, their value is
+derived the first time it is read, and re-used until one of its parameter values changes.
+"""
+import threading
+
+from .utils import get_in, same_value, set_in
+
+
+class DerivationCycleError(ValueError):
+    """Raised when derivations depend on each other in a cycle."""
+
+
+class Derivation(object):
+    """A single compiled derivation.
+
+    Attributes
+    ----------
+    key : tuple
+        Nested key the derived value is stored at
+    parameters : list of tuple
+        Nested keys of the values passed to the derivation function
+    function : callable
+        The derivation function
+    depends_on : list of Derivation
+        Derivations whose values are (part of) this derivation's parameters
+    lazy : bool
+        Derive the value on first access rather than on reload
+    """
+
+    __slots__ = ("key", "parameters", "function", "spec", "depends_on", "lazy")
+
+    def __init__(self, key, spec):
+        self.key = tuple(key)
+        self.parameters = [_as_path(parameter) for parameter in spec["parameters"]]
+        self.function = spec["derivation"]
+        self.spec = spec
+        self.depends_on = []
+        self.lazy = bool(spec.get("lazy", False))
+
+    def __repr__(self):
+        return "Derivation({!r})".format(list(self.key))
+
+
+class DerivationGraph(object):
+    """Derivations compiled into a topologically sorted dependency graph.
+
+    Compiled once per Conifer. The graph remembers the parameter values and result of each
+    derivation's last evaluation, so `derive` only evaluates derivations whose parameters
+    changed since.
+
+    Parameters
+    ----------
+    derivations : dict
+        Derivations as passed to Conifer, possibly nested
+
+    Raises
+    ------
+    DerivationCycleError
+        If derivations depend on each other in a cycle
+    """
+
+    def __init__(self, derivations):
+        derivations = [
+            Derivation(key, spec) for key, spec in iter_derivations(derivations)
+        ]
+
+        # Maps every prefix of every derived key to the derivations under that prefix
+        by_prefix = {}
+        for derivation in derivations:
+            for index in range(1, len(derivation.key) + 1):
+                by_prefix.setdefault(derivation.key[:index], []).append(derivation)
+
+        for derivation in derivations:
+            for parameter in derivation.parameters:
+                # derived values stored inside the parameter, eg. its nested keys
+                dependencies = list(by_prefix.get(parameter, []))
+                # derived values the parameter is stored inside of
+                for index in range(1, len(parameter)):
+                    for other in by_prefix.get(parameter[:index], []):
+                        if other.key == parameter[:index]:
+                            dependencies.append(other)
+                for dependency in dependencies:
+                    if dependency is not derivation and not any(
+                        dependency is seen for seen in derivation.depends_on
+                    ):
+                        derivation.depends_on.append(dependency)
+
+        self.derivations = _toposort(derivations)
+        # Derived keys, and the paths of the objects containing them
+        self.keys = frozenset(derivation.key for derivation in derivations)
+        self.sections = frozenset(
+            derivation.key[:index]
+            for derivation in derivations
+            for index in range(1, len(derivation.key))
+        )
+        # Nested dict of sections, see `_copy_sections`
+        self._section_tree = {}
+        for section in self.sections:
+            tree = self._section_tree
+            for part in section:
+                tree = tree.setdefault(part, {})
+        # Whether any derivation is lazy, see `derive`
+        self.lazy = any(derivation.lazy for derivation in derivations)
+        # Maps derivation keys to (parameter values, result) of the last evaluation
+        self._memo = {}
+
+    def __len__(self):
+        return len(self.derivations)
+
+    def copy(self):
+        """Return a graph sharing the compiled derivations, with a copy of the memo.
+
+        The copy re-uses this graph's results for unchanged parameters.
+        """
+        graph = DerivationGraph.__new__(DerivationGraph)
+        graph.__dict__.update(self.__dict__)
+        graph._memo = dict(self._memo)
+        return graph
+
+    def depends_on_any(self, paths, lazy=True):
+        """Return whether any derivation's parameters overlap any of paths.
+
+        A parameter overlaps a path if either is nested inside the other. Lazy derivations
+        are only considered if lazy is True.
+        """
+        for derivation in self.derivations:
+            if derivation.lazy and not lazy:
+                continue
+            for parameter in derivation.parameters:
+                for path in paths:
+                    size = min(len(path), len(parameter))
+                    if path[:size] == parameter[:size]:
+                        return True
+        return False
+
+    def derive(self, config):
+        """Evaluate derivations in dependency order, returning config with their values.
+
+        Derivations with an undefined parameter are skipped. Derivations whose parameter
+        values are unchanged since the last call re-use their previous result.
+
+        Lazy derivations are not evaluated. Instead, the dicts that would hold their values
+        are replaced by LazyDicts which derive the value on first access.
+
+        config is not modified, and its nested dicts may be shared with other configs: the
+        dicts holding derived values are copied before derived values are stored.
+
+        Returns
+        -------
+        dict, or LazyDict if it holds lazy values
+        """
+        config = _copy_sections(config, self._section_tree)
+        for derivation in self.derivations:
+            if derivation.lazy:
+                config = _install_lazy_value(
+                    config, derivation.key, _LazyValue(self, derivation)
+                )
+                continue
+
+            try:
+                params = [
+                    get_in(config, parameter) for parameter in derivation.parameters
+                ]
+            except KeyError:
+                # If key is not defined, don't try to derive a value
+                continue
+
+            set_in(config, derivation.key, self._evaluate(derivation, params))
+
+        return config
+
+    def _evaluate(self, derivation, params):
+        """Return the derivation's result for params, re-using the last result if unchanged."""
+        previous = self._memo.get(derivation.key)
+        if previous is not None and _same_values(previous[0], params):
+            return previous[1]
+
+        result = derivation.function(*params)
+        self._memo[derivation.key] = (params, result)
+        return result
+
+
+class LazyDict(dict):
+    """Dict holding lazily derived values, which are derived on first access.
+
+    Lazy values are derived by `d[key]`, `d.get(key)` and `key in d`, and stored in the dict
+    once derived. Until then, they are not included when iterating over the dict.
+    Copying or pickling a LazyDict gives a plain dict of the values derived so far.
+    """
+
+    __slots__ = ("_lazy",)
+
+    def __missing__(self, key):
+        lazy_value = self._lazy.get(key)
+        if lazy_value is None:
+            raise KeyError(key)
+
+        value = lazy_value.evaluate()
+        dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __reduce_ex__(self, protocol):
+        return (dict, (dict(self),))
+
+
+def materialize(config):
+    """Derive every lazy value in config, which may be nested.
+
+    Lazy values which can't be derived because a parameter is undefined are skipped.
+    """
+    if isinstance(config, LazyDict):
+        for key in config._lazy:
+            config.get(key)
+    for value in config.values():
+        if isinstance(value, dict):
+            materialize(value)
+    return config
+
+
+class _LazyValue(object):
+    """Derives one lazy value of one configuration when it is first accessed."""
+
+    __slots__ = ("graph", "derivation", "config", "lock")
+
+    def __init__(self, graph, derivation):
+        self.graph = graph
+        self.derivation = derivation
+        self.config = None
+        self.lock = threading.Lock()
+
+    def evaluate(self):
+        with self.lock:
+            # raises KeyError if a parameter isn't defined
+            params = [
+                get_in(self.config, parameter)
+                for parameter in self.derivation.parameters
+            ]
+            return self.graph._evaluate(self.derivation, params)
+
+
+def _install_lazy_value(config, key, lazy_value):
+    """Register lazy_value at key, converting the dicts that will hold it to LazyDicts.
+
+    Returns config, which is replaced by a LazyDict if it isn't one already.
+    """
+    if not isinstance(config, LazyDict):
+        config = _as_lazy_dict(config)
+    lazy_value.config = config
+
+    parent = config
+    for part in key[:-1]:
+        child = dict.get(parent, part)
+        if not isinstance(child, LazyDict):
+            child = _as_lazy_dict(child if isinstance(child, dict) else {})
+            dict.__setitem__(parent, part, child)
+        parent = child
+
+    parent._lazy[key[-1]] = lazy_value
+    return config
+
+
+def _as_lazy_dict(dic):
+    lazy_dict = LazyDict(dic)
+    lazy_dict._lazy = {}
+    return lazy_dict
+
+
+def _copy_sections(config, tree):
+    """Shallow copy config, and every nested dict at a path in tree."""
+    config = dict(config)
+    for key, subtree in tree.items():
+        child = config.get(key)
+        if isinstance(child, dict):
+            config[key] = _copy_sections(child, subtree)
+    return config
+
+
+def iter_derivations(derivations):
+    """Walk through derivations which may be nested.
+
+    Return (['nested', 'key'], value).
+    """
+    if derivations is not None:
+        for key, value in derivations.items():
+            if "derivation" not in value:
+                for subkey, sub_value in iter_derivations(value):
+                    yield ([key] + subkey, sub_value)
+            else:
+                yield ([key], value)
+
+
+def _as_path(key):
+    """Normalize string or list keys to a tuple path."""
+    if isinstance(key, str):
+        return (key,)
+    return tuple(key)
+
+
+def _same_values(previous, current):
+    return len(previous) == len(current) and all(
+        same_value(old, new) for old, new in zip(previous, current)
+    )
+
+
+def _toposort(derivations):
+    """Sort derivations so each comes after everything it depends on.
+
+    Otherwise keeps the declared order.
+    """
+    ordered = []
+    # 0: unvisited, 1: visiting, 2: done
+    state = {}
+
+    def visit(derivation, chain):
+        status = state.get(derivation.key, 0)
+        if status == 2:
+            return
+        if status == 1:
+            cycle = chain[chain.index(derivation.key) :] + [derivation.key]
+            raise DerivationCycleError(
+                "Derivations depend on each other in a cycle: {}".format(
+                    " -> ".join(".".join(key) for key in cycle)
+                )
+            )
+        state[derivation.key] = 1
+        for dependency in derivation.depends_on:
+            visit(dependency, chain + [derivation.key])
+        state[derivation.key] = 2
+        ordered.append(derivation)
+
+    for derivation in derivations:
+        visit(derivation, [])
+    return ordered
@@ -0,0 +1,201 @@
+"""Periodic refresh module for Conifer
+
+This module provides the `Refresher`, which calls `update_config` on an interval in a daemon
+thread or an asyncio task. Intervals are jittered so a fleet of processes doesn't refresh in
+lockstep, and failing refreshes back off exponentially. Since a failed `update_config`
+never publishes a new snapshot, the Conifer keeps serving its last good configuration.
+"""
+import random
+import threading
+import time
+
+try:
+    # not affected by changes of the system clock
+    _monotonic = time.monotonic
+except AttributeError:
+    # py2
+    _monotonic = time.time
+
+
+class RefreshStats(object):
+    """Counters describing a Refresher's refreshes.
+
+    Attributes
+    ----------
+    refreshes : int
+        Successful refreshes
+    failures : int
+        Failed refreshes
+    consecutive_failures : int
+        Failed refreshes since the last success
+    last_error : Exception
+        Error of the last failed refresh, or None after a success
+    last_latency : float
+        Seconds taken by the last refresh
+    max_latency : float
+        Most seconds taken by a refresh
+    total_latency : float
+        Seconds taken by all refreshes
+    last_success : float
+        `time.time()` of the last successful refresh
+    """
+
+    __slots__ = (
+        "refreshes",
+        "failures",
+        "consecutive_failures",
+        "last_error",
+        "last_latency",
+        "max_latency",
+        "total_latency",
+        "last_success",
+    )
+
+    def __init__(self):
+        self.refreshes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.last_latency = None
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+        self.last_success = None
+
+    @property
+    def mean_latency(self):
+        """Mean seconds taken by a refresh."""
+        attempts = self.refreshes + self.failures
+        if not attempts:
+            return None
+        return self.total_latency / attempts
+
+    def record(self, latency, error=None):
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self.total_latency += latency
+        if error is None:
+            self.refreshes += 1
+            self.consecutive_failures = 0
+            self.last_error = None
+            self.last_success = time.time()
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = error
+
+    def as_dict(self):
+        stats = dict((name, getattr(self, name)) for name in self.__slots__)
+        stats["mean_latency"] = self.mean_latency
+        return stats
+
+
+class Refresher(object):
+    """Periodically reload a Conifer.
+
+    Parameters
+    ----------
+    conf : Conifer
+        The Conifer to refresh
+
+    Kwargs
+    ------
+    interval : float
+        Seconds between refreshes
+    jitter : float
+        Each wait is randomly scaled by up to this fraction either way, eg. 0.1 waits
+        between 90% and 110% of the interval
+    backoff_factor : float
+        After consecutive failures, the interval is multiplied by this factor per failure
+    max_interval : float
+        Longest wait while backing off. Defaults to 10 times the interval.
+    """
+
+    def __init__(
+        self, conf, interval=30.0, jitter=0.1, backoff_factor=2.0, max_interval=None
+    ):
+        self._conf = conf
+        self.interval = interval
+        self.jitter = jitter
+        self.backoff_factor = backoff_factor
+        self.max_interval = max_interval if max_interval is not None else interval * 10
+        self.stats = RefreshStats()
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._task = None
+
+    def next_delay(self):
+        """Seconds to wait before the next refresh, with backoff and jitter applied."""
+        delay = self.interval
+        if self.stats.consecutive_failures:
+            delay = min(
+                self.interval * self.backoff_factor ** self.stats.consecutive_failures,
+                self.max_interval,
+            )
+        if self.jitter:
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return delay
+
+    def refresh(self):
+        """Refresh once, recording the outcome in `stats`. Never raises."""
+        start = _monotonic()
+        try:
+            self._conf.update_config()
+        except Exception as error:
+            self.stats.record(_monotonic() - start, error)
+        else:
+            self.stats.record(_monotonic() - start)
+
+    def start(self):
+        """Start refreshing in a daemon thread."""
+        if self.running:
+            raise RuntimeError("Refresher is already running")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="conifer-refresher")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def start_async(self):
+        """Start refreshing in an asyncio task on the running event loop.
+
+        Refreshes use `update_config_async`, so they never block the event loop.
+
+        Returns
+        -------
+        asyncio.Task
+        """
+        if self.running:
+            raise RuntimeError("Refresher is already running")
+        import asyncio
+
+        from ._async import refresh_forever
+
+        self._stop.clear()
+        self._task = asyncio.ensure_future(refresh_forever(self))
+        return self._task
+
+    @property
+    def running(self):
+        return self._thread is not None or self._task is not None
+
+    def stop(self):
+        """Stop refreshing. A thread is joined; an asyncio task is cancelled."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def __enter__(self):
+        if not self.running:
+            self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        while not self._stop.wait(self.next_delay()):
+            self.refresh()
@@ -0,0 +1,114 @@
+"""Context-local configuration overrides, see `Conifer.scoped`."""
+import threading
+
+from .conifer import Snapshot, _ThreadLocalVar
+from .utils import merged
+
+try:
+    from ._async import AsyncContextMixin
+except SyntaxError:
+    # no async syntax before py3.5
+    AsyncContextMixin = object
+
+
+class ScopedOverride(AsyncContextMixin):
+    """Context manager publishing a Snapshot with overrides to the current context only.
+
+    The Snapshot is built when the scope is entered, on top of the Snapshot visible at that
+    time, so scopes nest. It is stored in the Conifer's context variable, which is local to
+    the current thread or asyncio task, and reset when the scope exits.
+
+    Usable with `with` or `async with`, which needs py3.7+ for the overrides to be local
+    to the current asyncio task. Each ScopedOverride holds the state of one scope,
+    so it may be entered again once it exited, but not while it is entered, eg. by
+    concurrent tasks; call `Conifer.scoped` for each of them instead.
+
+    Parameters
+    ----------
+    conf : Conifer
+        The Conifer to override
+    overrides : dict
+        Nested dict of values to override
+    """
+
+    def __init__(self, conf, overrides):
+        self.conf = conf
+        self.overrides = overrides
+        # Held while entered, see __enter__
+        self._entered = threading.Lock()
+        # Resets the context variable on exit, only valid in the context which entered
+        self._token = None
+
+    def __enter__(self):
+        if not self._entered.acquire(False):
+            raise RuntimeError(
+                "Scoped overrides are already entered, use conf.scoped() for each scope"
+            )
+        try:
+            conf = self.conf
+            overlay = {}
+            paths = []
+            _coerce_overrides(conf.plan, self.overrides, (), overlay, paths)
+            # lazy sources must be loaded before their values are overridden
+            conf._load_deferred_at(paths)
+            snapshot = _scoped_snapshot(
+                conf, conf._scoped.get() or conf._snapshot, overlay, paths
+            )
+            self._token = conf._scoped.set(snapshot)
+        except BaseException:
+            self._entered.release()
+            raise
+        return snapshot
+
+    def _enter_async(self):
+        if isinstance(self.conf._scoped, _ThreadLocalVar):
+            # shared by all tasks of a thread, so overrides would leak between them
+            raise RuntimeError(
+                "async with conf.scoped() needs contextvars, available from py3.7"
+            )
+        return self.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        token, self._token = self._token, None
+        try:
+            self.conf._scoped.reset(token)
+        finally:
+            self._entered.release()
+
+
+def _scoped_snapshot(conf, snapshot, overlay, paths):
+    """Return snapshot with overlay applied, sharing all values not overridden.
+
+    overlay holds the coerced overrides, which are set at paths.
+    """
+    base = merged(snapshot._base, overlay)
+    graph = conf._derivation_graph
+    if graph.lazy or graph.depends_on_any(paths):
+        # with a copy of the memo, so reloads still re-use the Conifer's own results
+        config = graph.copy().derive(base)
+    else:
+        config = merged(snapshot._config, overlay)
+    layers = snapshot._layers + (("scoped", overlay),)
+    config, deferred = conf._defer_sources(config, layers)
+    return Snapshot(
+        config,
+        snapshot.generation,
+        base=base,
+        layers=layers,
+        deferred=deferred,
+        previous=snapshot,
+    )
+
+
+def _coerce_overrides(plan, overrides, prefix, overlay, paths):
+    """Fill overlay with the coerced and validated values of overrides."""
+    for key, value in overrides.items():
+        path = prefix + (key,)
+        leaf = plan.by_path.get(path)
+        if leaf is not None:
+            overlay[key] = leaf.coerce(value)
+            paths.append(path)
+        elif path in plan.sections and isinstance(value, dict):
+            _coerce_overrides(plan, value, path, overlay.setdefault(key, {}), paths)
+        else:
+            raise KeyError("{} is not defined by the schema".format(".".join(path)))
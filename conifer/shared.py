@@ -0,0 +1,173 @@
+"""Shared snapshot module for Conifer
+
+This module lets one process resolve configuration and share it with many others, eg. the
+workers of a pre-fork server. The resolving process publishes its current Snapshot to a
+file with `Conifer.publish` (see `publish_snapshot`). Workers open it with
+`SharedConfig`, which maps the file read-only and only deserializes it again once a newer
+snapshot has been published, so workers never load sources or validate anything.
+
+Each published file holds a header followed by the pickled configuration. New snapshots
+are written to a temporary file and renamed over the old one, so readers always see a
+whole file, and the old file's stale flag is set afterwards so readers notice the new one
+with a single memory read.
+
+The published file is unpickled by readers, so it must only be writable by trusted users.
+It is created with mode 0600.
+"""
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+
+from .conifer import Snapshot
+from .derivations import materialize
+from .utils import replace_file
+
+# magic, format version, stale flag, generation, payload length
+_HEADER = struct.Struct("<4sBB2xQQ")
+_MAGIC = b"CNFR"
+_VERSION = 1
+_STALE_OFFSET = 5
+
+
+def publish_snapshot(snapshot, path):
+    """Publish snapshot to path, for `SharedConfig` readers.
+
+    Parameters
+    ----------
+    snapshot : Snapshot
+        Snapshot to publish. Lazily derived values are evaluated first.
+    path : str
+        File to publish to. The directory must exist.
+
+    Side Effects
+    ------------
+    Atomically replaces the file at path, and marks the replaced file as stale.
+    """
+    # pickled as it is, no need for the copy made by `as_dict`
+    payload = pickle.dumps(materialize(snapshot._config), pickle.HIGHEST_PROTOCOL)
+    header = _HEADER.pack(_MAGIC, _VERSION, 0, snapshot.generation, len(payload))
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(header)
+            fp.write(payload)
+        try:
+            old = open(path, "r+b")
+        except (IOError, OSError):
+            old = None
+        try:
+            replace_file(tmp_path, path)
+            if old is not None:
+                old.seek(_STALE_OFFSET)
+                old.write(b"\x01")
+        finally:
+            if old is not None:
+                old.close()
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class SharedConfig(object):
+    """Read-only configuration published by another process with `Conifer.publish`.
+
+    Has the read API of Conifer. Each read checks whether a newer snapshot was published,
+    which costs a single memory read while it wasn't.
+
+        >>> conf = SharedConfig('/run/myapp/config')
+        >>> conf.db.host
+
+    Parameters
+    ----------
+    path : str
+        File the configuration is published to
+
+    Raises
+    ------
+    IOError
+        If nothing was published to path yet
+    ValueError
+        If path is not a published snapshot
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._mmap = None
+        self._snapshot = None
+        self._attach()
+
+    def _attach(self):
+        """Map the currently published file and deserialize its snapshot."""
+        with open(self._path, "rb") as fp:
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapped) < _HEADER.size:
+            mapped.close()
+            raise ValueError("{} is not a published snapshot".format(self._path))
+
+        magic, version, _, generation, length = _HEADER.unpack_from(mapped)
+        if magic != _MAGIC or version != _VERSION:
+            mapped.close()
+            raise ValueError("{} is not a published snapshot".format(self._path))
+
+        config = pickle.loads(mapped[_HEADER.size : _HEADER.size + length])
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = mapped
+        self._snapshot = Snapshot(config, generation)
+
+    def refresh(self):
+        """Attach to a newer published snapshot, if any.
+
+        Returns
+        -------
+        bool
+            Whether a newer snapshot was attached
+        """
+        if not self._stale():
+            return False
+        self._attach()
+        return True
+
+    @property
+    def generation(self):
+        """Generation of the publishing Conifer's Snapshot."""
+        return self.snapshot().generation
+
+    def snapshot(self):
+        """Return the latest published Snapshot."""
+        if self._stale():
+            self._attach()
+        return self._snapshot
+
+    def _stale(self):
+        """Whether the publisher replaced the attached file."""
+        # sliced, since indexing an mmap gives an int on py3 but a str on py2
+        return self._mmap[_STALE_OFFSET : _STALE_OFFSET + 1] != b"\x00"
+
+    def close(self):
+        """Unmap the published file."""
+        self._mmap.close()
+
+    def __getitem__(self, key):
+        return self.snapshot()[key]
+
+    def __getattr__(self, key):
+        if key.startswith("_"):
+            raise AttributeError(key)
+        return getattr(self.snapshot(), key)
+
+    def get(self, key, default=None):
+        """Get value, default, or None."""
+        return self.snapshot().get(key, default)
+
+    def get_in(self, key, default=None):
+        """Get maybe-nested value, default, or None."""
+        return self.snapshot().get_in(key, default)
+
+    def as_dict(self):
+        """Return plain config dictionary."""
+        return self.snapshot().as_dict()
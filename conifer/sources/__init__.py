@@ -2,6 +2,13 @@ from .click_opts import ClickOptionLoader
 from .dict_source import DictLoader
 from .environment_config import EnvironmentConfigLoader
 from .json_file import JSONFileLoader
+from .lazy import LazySource
 
 
-__all__ = [ClickOptionLoader, DictLoader, EnvironmentConfigLoader, JSONFileLoader]
+__all__ = [
+    ClickOptionLoader,
+    DictLoader,
+    EnvironmentConfigLoader,
+    JSONFileLoader,
+    LazySource,
+]
@@ -1,6 +1,4 @@
-from .schema_utils import coerce_value, nest_value
-
-from conifer.utils import recursive_update
+from conifer.utils import set_in
 
 
 class ClickOptionLoader(object):
@@ -9,6 +7,14 @@ class ClickOptionLoader(object):
     Only intended for internal use by the click_wrap utility."""
 
     def __init__(self, schema_info, values=None):
+        """
+        Parameters
+        ----------
+        schema_info : dict
+            Maps click kwarg names to the SchemaLeaf of the option
+        values : dict
+            Maps click kwarg names to the raw values passed on the CLI
+        """
         self.schema_info = schema_info
         self.values = values
 
@@ -20,15 +26,10 @@ class ClickOptionLoader(object):
         #
         partial_config = {}
         for parameter_key, raw_value in self.values.items():
-            coerced_value = coerce_value(
-                raw_value, self.schema_info[parameter_key]["schema"]
-            )
+            leaf = self.schema_info[parameter_key]
+            coerced_value = leaf.coerce(raw_value)
 
             if coerced_value is not None:
-                new_data = nest_value(
-                    self.schema_info[parameter_key]["schema_path"], coerced_value
-                )
-
-                recursive_update(partial_config, new_data)
+                set_in(partial_config, leaf.path, coerced_value)
 
         return partial_config
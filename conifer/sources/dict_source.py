@@ -1,7 +1,5 @@
-from pyrsistent import thaw
-
-from .schema_utils import coerce_value, iter_schema, nest_value
-from conifer.utils import get_in, recursive_update
+from .schema_utils import compile_schema
+from conifer.utils import get_in, set_in
 
 
 class DictLoader(object):
@@ -10,18 +8,24 @@ class DictLoader(object):
     def __init__(self, data):
         self._data = data
 
+    def cache_fingerprint(self, schema):
+        """The data itself, for `conifer.cache.ConfigCache`."""
+        return self._data
+
     def load_config(self, schema):
         """Load configuration values for this schema."""
+        from pyrsistent import thaw
+
         partial_config = thaw(self._data)
 
-        for key_name, sub_schema in iter_schema(schema):
+        for leaf in compile_schema(schema).leaves:
             try:
-                raw_value = get_in(self._data, key_name)
+                raw_value = get_in(self._data, leaf.path)
             except KeyError:
                 continue
 
-            coerced_value = coerce_value(raw_value, sub_schema)
+            coerced_value = leaf.coerce(raw_value)
 
-            recursive_update(partial_config, nest_value(key_name, coerced_value))
+            set_in(partial_config, leaf.path, coerced_value)
 
         return partial_config
@@ -1,25 +1,103 @@
-from .schema_utils import coerce_value, iter_schema, nest_value
-from conifer.utils import recursive_update
+from .schema_utils import compile_schema, _walk_schema
+from conifer.utils import set_in
 
 import os
+import warnings
 
 
 class EnvironmentConfigLoader(object):
-    """Loader for environment variables."""
+    """Loader for environment variables.
+
+    Variable names are the prefix followed by the nested key names joined with `_`,
+    eg. `MYAPP_LOGGING_VERBOSITY` for ['LOGGING', 'VERBOSITY'] with prefix `MYAPP_`.
+
+    Variables starting with a non-empty prefix that don't match any key in the schema are
+    listed in `unknown_variables` after each load, and reported with a warning. If the
+    schema is restricted to some sections, variables of keys in other sections are
+    skipped silently.
+    """
 
     def __init__(self, prefix=""):
         self._prefix = prefix
+        # (plan, {variable name: [SchemaLeaf, ...]}) for the last plan loaded
+        self._index = None
+        # (plan, variable names of the plan's full schema), see `_outside_sections`
+        self._full_names = None
+        self.unknown_variables = []
+
+    def _variable_index(self, plan):
+        """Return the mapping of variable names to leaves for plan, built once per plan."""
+        if self._index is None or self._index[0] is not plan:
+            index = {}
+            for leaf in plan.leaves:
+                index.setdefault(self._prefix + leaf.env_name, []).append(leaf)
+            self._index = (plan, index)
+        return self._index[1]
+
+    def _outside_sections(self, plan):
+        """Return the variable names of keys in the sections plan was restricted from.
+
+        Built once per plan, and only when variables don't match any key of plan.
+        """
+        if plan.full_schema is None:
+            return frozenset()
+        if self._full_names is None or self._full_names[0] is not plan:
+            names = frozenset(
+                self._prefix + leaf.env_name
+                for leaf in compile_schema(plan.full_schema).leaves
+            )
+            self._full_names = (plan, names)
+        return self._full_names[1]
+
+    def cache_fingerprint(self, schema):
+        """Values of the variables this loader reads, for `conifer.cache.ConfigCache`.
+
+        With a prefix, every variable starting with it is included. Without one, only the
+        variables named after keys of the schema are.
+        """
+        if self._prefix:
+            return sorted(
+                (name, value)
+                for name, value in os.environ.items()
+                if name.startswith(self._prefix)
+            )
+        names = sorted("_".join(path) for path, _ in _walk_schema(schema, schema))
+        return [(name, os.environ.get(name)) for name in names]
 
     def load_config(self, schema):
         """Load configuration values for this schema."""
+        plan = compile_schema(schema)
+        index = self._variable_index(plan)
+        prefix = self._prefix
+
         partial_config = {}
+        unknown_variables = []
+
+        for name, raw_value in list(os.environ.items()):
+            if not name.startswith(prefix):
+                continue
+
+            leaves = index.get(name)
+            if leaves is None:
+                if prefix:
+                    unknown_variables.append(name)
+                continue
 
-        for key_name, sub_schema in iter_schema(schema):
-            environment_key = self._prefix + "_".join(key_name)
-            raw_value = os.environ.get(environment_key)
-            coerced_value = coerce_value(raw_value, sub_schema)
+            for leaf in leaves:
+                coerced_value = leaf.coerce(raw_value)
+                if coerced_value is not None:
+                    set_in(partial_config, leaf.path, coerced_value)
 
-            if coerced_value is not None:
-                recursive_update(partial_config, nest_value(key_name, coerced_value))
+        if unknown_variables:
+            outside_sections = self._outside_sections(plan)
+            unknown_variables = [
+                name for name in unknown_variables if name not in outside_sections
+            ]
+        self.unknown_variables = sorted(unknown_variables)
+        if unknown_variables:
+            warnings.warn(
+                "Environment variables with prefix {} don't match any configuration key: "
+                "{}".format(prefix, ", ".join(self.unknown_variables))
+            )
 
         return partial_config
@@ -1,14 +1,22 @@
+import hashlib
 import json
 import os
 
-from .schema_utils import coerce_value, iter_schema, nest_value
-from conifer.utils import get_in, recursive_update
+from .schema_utils import compile_schema
+from conifer.utils import get_in, set_in
 
 
 class JSONFileLoader(object):
-    """Loader for JSON files."""
+    """Loader for JSON files.
 
-    def __init__(self, path=None, fp=None):
+    Files given by path are first read by `load_config`, not on construction, so a
+    Conifer restored from `conifer.cache` never reads them. They are read again on every
+    `load_config` if they have changed, so `Conifer.update_config` picks up edits. Whether the file changed is decided by a cheap
+    fingerprint: its mtime, size and inode, or a hash of its contents if `checksum` is set.
+    Unchanged files return the previously loaded configuration without being parsed again.
+    """
+
+    def __init__(self, path=None, fp=None, checksum=False):
         """JSON file config loader.
 
         Must be instantiated with one of path or fp.
@@ -18,7 +26,11 @@ class JSONFileLoader(object):
         path : string
             Path to a json file
         fp : File pointer
-            Pointer to an open file object
+            Pointer to an open file object. It is only read once.
+        checksum : bool (False)
+            Fingerprint the file by hashing its contents rather than by its stat info.
+            The file is read (but not parsed) on every load, which also catches edits
+            that don't change its mtime or size.
         """
         if path is not None and fp is not None:
             raise ValueError(
@@ -33,30 +45,95 @@ class JSONFileLoader(object):
             path = os.path.abspath(os.path.expanduser(os.path.expandvars(path)))
         self._path = path
         self._fp = fp
+        self._checksum = checksum
 
-        self._load_data()
+        self._data = None
+        self._fingerprint = None
+        # (fingerprint, plan, partial_config) of the last load_config call
+        self._cache = None
+
+        if path is None:
+            # file pointers may be closed by the time the config is loaded
+            self._load_data()
 
     def _load_data(self):
-        if self._path is not None:
-            if not os.path.exists(self._path):
-                self._data = {}
-                return
+        """Read the file if its fingerprint changed since it was last read."""
+        if self._path is None:
+            # file pointers can only be read once
+            if self._data is None:
+                self._data = json.load(self._fp)
+            return
+
+        fingerprint, contents = self._read_fingerprint()
+        if self._data is not None and fingerprint == self._fingerprint:
+            return
+
+        if fingerprint is None:
+            data = {}
+        elif contents is None:
             with open(self._path, "rb") as _fp:
-                self._data = json.load(_fp)
+                data = json.load(_fp)
         else:
-            self._data = json.load(self._fp)
+            data = json.loads(contents.decode("utf-8"))
+
+        self._data = data
+        self._fingerprint = fingerprint
+
+    def _read_fingerprint(self):
+        """Return (fingerprint, contents) of the file at path.
+
+        The fingerprint is None if the file doesn't exist. Contents are only read when
+        fingerprinting by checksum, otherwise they are None.
+        """
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return None, None
+
+        if not self._checksum:
+            mtime = getattr(stat, "st_mtime_ns", stat.st_mtime)
+            return (mtime, stat.st_size, stat.st_ino), None
+
+        with open(self._path, "rb") as _fp:
+            contents = _fp.read()
+        return (len(contents), hashlib.sha1(contents).hexdigest()), contents
+
+    def watch_paths(self):
+        """Files this loader reads, for `conifer.watch.ConfigWatcher`."""
+        if self._path is None:
+            return []
+        return [self._path]
+
+    def cache_fingerprint(self, schema):
+        """Fingerprint of the file, for `conifer.cache.ConfigCache`."""
+        if self._path is None:
+            return None
+        return [self._path, self._read_fingerprint()[0]]
 
     def load_config(self, schema):
-        """Load configuration values for this schema."""
+        """Load configuration values for this schema.
+
+        The returned configuration is re-used while the file is unchanged, so it must not
+        be modified.
+        """
+        self._load_data()
+        plan = compile_schema(schema)
+
+        if self._cache is not None:
+            fingerprint, cached_plan, partial_config = self._cache
+            if fingerprint == self._fingerprint and cached_plan is plan:
+                return partial_config
+
         partial_config = {}
 
-        for key_name, sub_schema in iter_schema(schema):
+        for leaf in plan.leaves:
             try:
-                raw_value = get_in(self._data, key_name)
+                raw_value = get_in(self._data, leaf.path)
             except KeyError:
                 continue
-            coerced_value = coerce_value(raw_value, sub_schema)
+            coerced_value = leaf.coerce(raw_value)
 
-            recursive_update(partial_config, nest_value(key_name, coerced_value))
+            set_in(partial_config, leaf.path, coerced_value)
 
+        self._cache = (self._fingerprint, plan, partial_config)
         return partial_config
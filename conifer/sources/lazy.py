@@ -0,0 +1,33 @@
+class LazySource(object):
+    """Wrapper making any source lazy: it is loaded on first access to keys it provides.
+
+    See "Lazy sources" in `Conifer`. All other attributes, eg. `cache_fingerprint` or
+    `watch_paths`, are those of the wrapped source.
+    """
+
+    def __init__(self, source, provides):
+        """Lazy source wrapper.
+
+        Parameters
+        ----------
+        source : object
+            Any source, eg. a JSONFileLoader
+        provides : list
+            Key prefixes the source can set values at or below, as dotted key paths like
+            'features' or 'tenants.acme', or lists of keys
+        """
+        self.source = source
+        self.provides = provides
+
+    def __getattr__(self, key):
+        if key == "source":
+            # not yet set, eg. when unpickling
+            raise AttributeError(key)
+        return getattr(self.source, key)
+
+    def __repr__(self):
+        return "LazySource({!r}, provides={!r})".format(self.source, self.provides)
+
+    def load_config(self, schema):
+        """Load configuration values for this schema from the wrapped source."""
+        return self.source.load_config(schema)
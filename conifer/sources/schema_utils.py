@@ -1,12 +1,223 @@
-import yaml
+import re
 
-from jsonschema import Draft4Validator
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:  # py2
+    from collections import Mapping, Sequence
 
 
 class CoercionError(Exception):
     pass
 
 
+class SchemaLeaf(object):
+    """A single configurable key of a compiled SchemaPlan.
+
+    Attributes
+    ----------
+    path : tuple
+        Nested key names leading to this value, eg. ('outer', 'inner')
+    schema : dict
+        The leaf's subschema, with any `$ref` already resolved
+    env_name : str
+        Un-prefixed environment variable name for this key, eg. 'outer_inner'
+    coerce : callable
+        Compiled coercer for this leaf, see `compile_coercer`
+    """
+
+    __slots__ = ("path", "schema", "env_name", "coerce", "_validator")
+
+    def __init__(self, path, schema, memo_size=0):
+        self.path = tuple(path)
+        self.schema = schema
+        self.env_name = "_".join(self.path)
+        self.coerce = compile_coercer(schema, memo_size=memo_size)
+        self._validator = None
+
+    @property
+    def validator(self):
+        """Draft4Validator for this leaf's subschema, built on first use."""
+        if self._validator is None:
+            from jsonschema import Draft4Validator
+
+            self._validator = Draft4Validator(self.schema)
+        return self._validator
+
+    def __repr__(self):
+        return "SchemaLeaf({!r})".format(list(self.path))
+
+
+# Raw values each leaf of a SchemaPlan remembers the coerced value of, see `compile_coercer`
+_LEAF_MEMO_SIZE = 16
+
+
+class SchemaPlan(Mapping):
+    """Schema compiled once into the structures every source needs to load config.
+
+    Walking the schema, resolving `$ref`s and building validators is only done here,
+    so a SchemaPlan can be shared by all sources and re-used across every
+    `Conifer.update_config` call.
+
+    A SchemaPlan is also a read-only Mapping over the (frozen) schema it was built from,
+    so it may be passed anywhere a schema is expected.
+
+    Parameters
+    ----------
+    schema : dict
+        JSONSchema Draft 4 compatible schema definition
+    full_schema : dict or SchemaPlan
+        The schema the sections of schema were selected from, if any, see
+        `select_sections`. Only compiled if a source needs it, eg. to tell keys of
+        other sections from undefined keys.
+    """
+
+    def __init__(self, schema, full_schema=None):
+        from pyrsistent import freeze, thaw
+
+        self._schema = freeze(schema)
+        self.full_schema = full_schema
+
+        root = thaw(self._schema)
+        self.leaves = tuple(
+            SchemaLeaf(path, sub_schema, memo_size=_LEAF_MEMO_SIZE)
+            for path, sub_schema in _walk_schema(root, root)
+        )
+        self.by_path = dict((leaf.path, leaf) for leaf in self.leaves)
+        # Paths of the objects containing leaves
+        self.sections = frozenset(
+            leaf.path[:index]
+            for leaf in self.leaves
+            for index in range(1, len(leaf.path))
+        )
+        self.by_env_name = dict((leaf.env_name, leaf) for leaf in self.leaves)
+
+    @property
+    def schema(self):
+        """The frozen schema this plan was compiled from."""
+        return self._schema
+
+    def __getitem__(self, key):
+        return self._schema[key]
+
+    def __iter__(self):
+        return iter(self._schema)
+
+    def __len__(self):
+        return len(self._schema)
+
+    def __hash__(self):
+        return hash(self._schema)
+
+    def __eq__(self, other):
+        if isinstance(other, SchemaPlan):
+            return self._schema == other._schema
+        return self._schema == other
+
+    def __ne__(self, other):
+        return not self == other
+
+
+def compile_schema(schema):
+    """Return a SchemaPlan for schema, re-using schema if it is already compiled."""
+    if isinstance(schema, SchemaPlan):
+        return schema
+    return SchemaPlan(schema)
+
+
+def select_sections(schema, sections):
+    """Return a schema of only the top-level properties named by sections.
+
+    Local `$ref`s from the selected sections keep resolving: the definitions they refer to
+    are kept, and parts of other sections they refer to are copied into `definitions`. All
+    other definitions, and the root's keywords constraining other properties (eg.
+    `additionalProperties`), are left out. Only the selected sections and what they refer
+    to are copied, so the cost scales with them rather than with the whole schema.
+
+    Parameters
+    ----------
+    schema : dict or SchemaPlan
+        JSONSchema Draft 4 compatible schema definition
+    sections : list
+        Names of top-level properties of schema
+
+    Returns
+    -------
+    dict
+
+    Raises
+    ------
+    KeyError
+        If a section is not a top-level property of schema
+    """
+    if isinstance(schema, SchemaPlan):
+        schema = schema.schema
+    properties = schema.get("properties", {})
+    for section in sections:
+        if section not in properties:
+            raise KeyError("{} is not defined by the schema".format(section))
+
+    copier = _SectionCopier(schema, sections)
+    selected = dict(
+        (keyword, schema[keyword]) for keyword in _ROOT_KEYWORDS if keyword in schema
+    )
+    selected["properties"] = dict(
+        (section, copier.copy(properties[section])) for section in sections
+    )
+    required = [key for key in schema.get("required", ()) if key in sections]
+    if required:
+        selected["required"] = required
+    if copier.definitions:
+        selected["definitions"] = copier.definitions
+    return selected
+
+
+# Keywords of the root schema kept by `select_sections`
+_ROOT_KEYWORDS = ("$schema", "id", "title", "description", "type")
+
+
+class _SectionCopier(object):
+    """Copies parts of a schema, rewriting local `$ref`s so they resolve in the copy.
+
+    Referenced definitions are collected in `definitions`, see `select_sections`.
+    """
+
+    def __init__(self, root, sections):
+        self.root = root
+        self.sections = sections
+        self.definitions = {}
+
+    def copy(self, node):
+        if isinstance(node, Mapping):
+            copy = dict((key, self.copy(value)) for key, value in node.items())
+            ref = copy.get("$ref")
+            if isinstance(ref, _string_types) and ref.startswith("#/"):
+                copy["$ref"] = self.rewrite(ref)
+            return copy
+        if isinstance(node, Sequence) and not isinstance(node, _string_types):
+            return [self.copy(value) for value in node]
+        return node
+
+    def rewrite(self, ref):
+        """Return where the target of ref is in the copy, copying it if needed."""
+        parts = ref[2:].split("/")
+        if parts[0] == "properties" and len(parts) > 1 and parts[1] in self.sections:
+            return ref
+        if parts[0] == "definitions" and len(parts) > 1:
+            # keep the whole definition, its pointer stays the same
+            name = parts[1].replace("~1", "/").replace("~0", "~")
+            target = self.root["definitions"][name]
+        else:
+            # eg. part of another section: copied into a definition named by the pointer
+            name = ref[2:]
+            target = resolve_pointer(self.root, ref)
+            ref = "#/definitions/" + name.replace("~", "~0").replace("/", "~1")
+        if name not in self.definitions:
+            # set first, so recursive references don't recurse forever
+            self.definitions[name] = None
+            self.definitions[name] = self.copy(target)
+        return ref
+
+
 def nest_value(key, value):
     """Take an array key representation and return it as a nested object
 
@@ -18,84 +229,268 @@ def nest_value(key, value):
         return {key[0]: nest_value(key[1:], value)}
 
 
-def iter_schema(schema):
+def iter_schema(schema, sections=None):
     """Return resolved key names with schemas for all keys.
 
     Generator yielding (key_name, schema) where key_name is a list of
     keys indicating nesting, eg
 
     (['outer', 'inner', 'nested'], {'type': 'string'})
+
+    Accepts either a schema or a compiled SchemaPlan; the schema is only walked once per plan.
+    If sections are passed, only keys of those top-level properties, see `select_sections`.
+    """
+    if sections is not None:
+        schema = select_sections(schema, sections)
+    for leaf in compile_schema(schema).leaves:
+        yield (list(leaf.path), leaf.schema)
+
+
+def _walk_schema(schema, root):
+    """Walk schema properties, yielding (key_path, resolved_schema) for every leaf.
+
+    `$ref`s are resolved against root into new dicts, so neither schema is modified.
     """
-    validator = Draft4Validator(schema)
     for key, value in schema.get("properties", {}).items():
-        if value.get("$ref"):
-            value.update(validator.resolver.resolve(value.get("$ref"))[1])
-            value.pop("$ref")
+        value = _resolve_ref(value, root)
         if value.get("type") == "object":
-            for subkey, sub_value in iter_schema(value):
+            for subkey, sub_value in _walk_schema(value, root):
                 yield ([key] + subkey, sub_value)
         else:
             yield ([key], value)
 
 
+def _resolve_ref(schema, root):
+    """Return schema with `$ref` replaced by the referenced definition.
+
+    Keys from the referenced definition take precedence over sibling keys of the `$ref`.
+    """
+    while schema.get("$ref"):
+        ref = schema["$ref"]
+        resolved = dict(schema)
+        resolved.pop("$ref")
+        if ref.startswith("#"):
+            target = resolve_pointer(root, ref)
+        else:
+            from jsonschema import Draft4Validator
+
+            target = Draft4Validator(root).resolver.resolve(ref)[1]
+        resolved.update(target)
+        schema = resolved
+    return schema
+
+
+def resolve_pointer(root, ref):
+    """Return the part of root referenced by a local `$ref`, eg. '#/definitions/thing'."""
+    target = root
+    for part in ref.lstrip("#").split("/"):
+        if part:
+            part = part.replace("~1", "/").replace("~0", "~")
+            target = target[int(part) if isinstance(target, list) else part]
+    return target
+
+
 def coerce_value(value, schema):
     """Attempt to coerce a value to a valid schema-defined type.
 
     We're doing our best here folks, if it doesn't work, your schema
     may be more complicated than you need it to be...
+
+    Compiles a one-off coercer; use `compile_coercer` to coerce many values for one schema.
     """
-    # nonetype is easy to handle
-    if value is None:
-        return None
+    return compile_coercer(schema)(value)
+
+
+def compile_coercer(schema, memo_size=0):
+    """Compile schema into a single callable which coerces and validates raw values.
+
+    Type dispatch, coercion and the simple validation keywords (type, enum, minimum,
+    maximum, lengths and pattern) are resolved once here. A full Draft4Validator is only
+    built when the schema uses other validation keywords, or to report a validation error.
+
+    Parameters
+    ----------
+    schema : dict
+        Leaf subschema to coerce values for
+    memo_size : int
+        Remember up to this many coerced values keyed on the raw input, so coercing an
+        unchanged raw value again is a dict lookup. 0 disables the memo.
+
+    Returns
+    -------
+    callable taking a raw value and returning the coerced value, or None for None
+    """
+    validator_cache = []
+
+    def validate(value):
+        # only build a real validator when we need one
+        if not validator_cache:
+            from jsonschema import Draft4Validator
+
+            validator_cache.append(Draft4Validator(schema))
+        validator_cache[0].validate(value)
+
+    checks = _compile_checks(schema)
+    if checks is None:
+
+        def check(value):
+            validate(value)
+            return value
+
+    else:
+
+        def check(value):
+            for is_valid in checks:
+                if not is_valid(value):
+                    # our checks are conservative, let jsonschema have the final word
+                    validate(value)
+                    break
+            return value
 
-    validator = Draft4Validator(schema)
-    value_type = type(value)
     schema_type = schema.get("type")
+    if isinstance(schema_type, _string_types):
+        candidates = [_compile_type_coercion(schema_type)]
+    elif schema_type is not None:
+        candidates = [_compile_type_coercion(desired) for desired in schema_type]
+    else:
+        subschemas = schema.get("anyOf") or schema.get("oneOf") or schema.get("allOf")
+        if subschemas:
+            candidates = [compile_coercer(subschema) for subschema in subschemas]
+        else:
+            candidates = [lambda value: value]
 
-    if isinstance(schema_type, str):
-        coerced_value = _coercion_matrix[value_type][schema_type](value)
-        validator.validate(coerced_value)
-        return coerced_value
+    if len(candidates) == 1:
+        to_type = candidates[0]
 
-    schema_allof = schema.get("allOf")
-    schema_anyof = schema.get("anyOf")
-    schema_oneof = schema.get("oneOf")
-
-    def coerce_iterable(schemas, stop_on_valid=True):
-        last_exception = None
-        for desirable_type in schemas:
-            try:
-                coerced_value = _coercion_matrix[value_type][desirable_type](value)
-                # Try to validate; if we can't maybe we can try another type
-                validator.validate(coerced_value)
-            except Exception as last_exception:
-                # Not coercing to the first option is not unexpected
-                pass
-            # raise last exception with traceback
-            if last_exception:
-                raise
-
-            if stop_on_valid:
-                return coerced_value
+        def coerce(value):
+            if value is None:
+                return None
+            return check(to_type(value))
 
+    else:
+
+        def coerce(value):
+            # Not coercing to the first option is not unexpected
+            if value is None:
+                return None
+            error = None
+            for to_type in candidates:
+                try:
+                    return check(to_type(value))
+                except Exception as exc:
+                    error = exc
+            raise error
+
+    if not memo_size:
+        return coerce
+
+    memo = {}
+
+    def memoized_coerce(value):
+        try:
+            key = (type(value), value)
+            return memo[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # unhashable input
+            return coerce(value)
+
+        coerced_value = coerce(value)
+        # mutable results can't be shared between configs
+        if isinstance(coerced_value, _immutable_types):
+            if len(memo) >= memo_size:
+                memo.clear()
+            memo[key] = coerced_value
         return coerced_value
 
-    if isinstance(schema_type, list):
-        return coerce_iterable(schema_type)
+    return memoized_coerce
+
+
+def _compile_type_coercion(schema_type):
+    """Return a function coercing any supported value type to schema_type."""
+    coercions = dict(
+        (value_type, row[schema_type])
+        for value_type, row in _coercion_matrix.items()
+        if schema_type in row
+    )
+
+    def to_type(value):
+        try:
+            coercion = coercions[type(value)]
+        except KeyError:
+            _raise_coercion_error(value, schema_type)
+        return coercion(value)
+
+    return to_type
+
+
+def _compile_checks(schema):
+    """Compile the simple validation keywords of schema to a list of predicates.
+
+    The predicates may reject values a Draft4Validator would accept, but never the reverse.
+    Returns None if schema uses keywords that need a real validator.
+    """
+    if not _VALIDATION_KEYWORDS.intersection(schema) <= _COMPILED_KEYWORDS:
+        return None
+
+    checks = []
 
-    if schema_anyof is not None:
-        return coerce_iterable(schema["anyOf"])
+    schema_type = schema.get("type")
+    if schema_type is not None:
+        if isinstance(schema_type, _string_types):
+            schema_type = [schema_type]
+        if not set(schema_type) <= set(_type_checks):
+            return None
+        types = [_type_checks[desired] for desired in schema_type]
+        checks.append(lambda value: any(is_type(value) for is_type in types))
+
+    if "enum" in schema:
+        enum = list(schema["enum"])
+        checks.append(
+            lambda value: any(
+                type(option) is type(value) and option == value for option in enum
+            )
+        )
+
+    def number_check(check):
+        return lambda value: not _type_checks["number"](value) or check(value)
+
+    def string_check(check):
+        return lambda value: not isinstance(value, _string_types) or check(value)
+
+    if "minimum" in schema:
+        minimum = schema["minimum"]
+        if schema.get("exclusiveMinimum"):
+            checks.append(number_check(lambda value: value > minimum))
+        else:
+            checks.append(number_check(lambda value: value >= minimum))
+
+    if "maximum" in schema:
+        maximum = schema["maximum"]
+        if schema.get("exclusiveMaximum"):
+            checks.append(number_check(lambda value: value < maximum))
+        else:
+            checks.append(number_check(lambda value: value <= maximum))
 
-    if schema_allof is not None:
-        return coerce_iterable(schema["allOf"], stop_on_valid=False)
+    if "minLength" in schema:
+        min_length = schema["minLength"]
+        checks.append(string_check(lambda value: len(value) >= min_length))
 
-    if schema_oneof is not None:
-        return coerce_iterable(schema["oneOf"])
+    if "maxLength" in schema:
+        max_length = schema["maxLength"]
+        checks.append(string_check(lambda value: len(value) <= max_length))
+
+    if "pattern" in schema:
+        pattern = re.compile(schema["pattern"])
+        checks.append(string_check(lambda value: pattern.search(value) is not None))
+
+    return checks
 
 
 def _string_to_array(value):
     """Attempt to divine an array from what we got."""
-    return map(lambda x: x.strip(), value.split(","))
+    return [x.strip() for x in value.split(",")]
 
 
 def _string_to_bool(value):
@@ -103,13 +498,35 @@ def _string_to_bool(value):
 
     Accepts lots of stuff from the yaml spec, like 0, yes, no, TRUE, etc
     """
+    try:
+        return _BOOLEAN_STRINGS[value]
+    except KeyError:
+        pass
+
+    import yaml
+
     return bool(yaml.safe_load(value))
 
 
+# Strings yaml loads as booleans (or 0 and 1), so most values don't need yaml
+_BOOLEAN_STRINGS = dict(
+    (variant, value)
+    for words, value in [
+        (("true", "yes", "on", "1"), True),
+        (("false", "no", "off", "0", ""), False),
+    ]
+    for word in words
+    for variant in (word, word.capitalize(), word.upper())
+)
+
+
 def _string_to_object(value):
+    import yaml
+
     value = yaml.safe_load(value)
     if not isinstance(value, dict):
         raise CoercionError("Could not coerce string '{}' to dict".format(value))
+    return value
 
 
 def _coerce_to_number(value):
@@ -118,11 +535,23 @@ def _coerce_to_number(value):
     Since json schema spec is loose here, we'll return the int value
     if it's equal to the float value, otherwise give you a float.
     """
+    if isinstance(value, _string_types):
+        try:
+            return int(value)
+        except ValueError:
+            value = float(value)
     if int(value) == float(value):
         return int(value)
     return float(value)
 
 
+def _float_to_integer(value):
+    """Coerce floats with no fractional part, eg. 2.0, to integers."""
+    if not value.is_integer():
+        _raise_coercion_error(value, "integer")
+    return int(value)
+
+
 def _raise_coercion_error(value, desired_type):
     value_type = type(value)
     raise CoercionError(
@@ -157,6 +586,14 @@ _coercion_matrix = {
         "object": lambda x: _raise_coercion_error(x, "object"),
         "string": lambda x: str(x),
     },
+    float: {
+        "array": lambda x: [x],
+        "boolean": lambda x: bool(x),
+        "integer": _float_to_integer,
+        "number": _coerce_to_number,
+        "object": lambda x: _raise_coercion_error(x, "object"),
+        "string": lambda x: str(x),
+    },
     bool: {
         "array": lambda x: bool(x),
         "boolean": lambda x: bool(x),
@@ -184,3 +621,74 @@ try:
 except NameError:
     # unicode type not present in py3
     pass
+
+try:
+    _string_types = (str, unicode)
+except NameError:
+    # unicode type not present in py3
+    _string_types = (str,)
+
+_number_types = (int, float)
+
+# Values which are safe to share between coercions
+_immutable_types = _string_types + _number_types + (bool,)
+
+# Conservative Draft 4 type checks, see `_compile_checks`
+_type_checks = {
+    "array": lambda x: isinstance(x, list),
+    "boolean": lambda x: isinstance(x, bool),
+    "integer": lambda x: isinstance(x, int) and not isinstance(x, bool),
+    "null": lambda x: x is None,
+    "number": lambda x: isinstance(x, _number_types) and not isinstance(x, bool),
+    "object": lambda x: isinstance(x, dict),
+    "string": lambda x: isinstance(x, _string_types),
+}
+
+# Draft 4 keywords which constrain a value
+_VALIDATION_KEYWORDS = frozenset(
+    [
+        "$ref",
+        "additionalItems",
+        "additionalProperties",
+        "allOf",
+        "anyOf",
+        "dependencies",
+        "enum",
+        "exclusiveMaximum",
+        "exclusiveMinimum",
+        "format",
+        "items",
+        "maxItems",
+        "maxLength",
+        "maxProperties",
+        "maximum",
+        "minItems",
+        "minLength",
+        "minProperties",
+        "minimum",
+        "multipleOf",
+        "not",
+        "oneOf",
+        "pattern",
+        "patternProperties",
+        "properties",
+        "required",
+        "type",
+        "uniqueItems",
+    ]
+)
+
+# Keywords `_compile_checks` can check without a validator
+_COMPILED_KEYWORDS = frozenset(
+    [
+        "enum",
+        "exclusiveMaximum",
+        "exclusiveMinimum",
+        "maxLength",
+        "maximum",
+        "minLength",
+        "minimum",
+        "pattern",
+        "type",
+    ]
+)
@@ -1,4 +1,13 @@
-from collections import Mapping
+import os
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # py2
+    from collections import Mapping
+
+# Rename a file over another, atomically. os.replace overwrites on every platform, but is
+# only available from py3.3
+replace_file = getattr(os, "replace", os.rename)
 
 
 def recursive_update(original, updates):
@@ -21,16 +30,226 @@ def recursive_update(original, updates):
             original[key] = value
 
 
+def merged(original, updates):
+    """Return original recursively updated with updates, without modifying either.
+
+    Only the dicts along updated keys are copied; all other values are shared with original
+    and updates, so neither may be modified afterwards. Lists are replaced, not updated.
+    """
+    result = dict(original)
+    for key, value in updates.items():
+        current = result.get(key)
+        if isinstance(value, Mapping) and isinstance(current, Mapping):
+            result[key] = merged(current, value)
+        else:
+            result[key] = value
+    return result
+
+
+def merge_layers(layers, previous=None):
+    """Return the recursive merge of layers, later layers taking precedence.
+
+    Merges like applying `recursive_update` for each layer in turn, in a single pass and
+    without modifying or copying any layer: a value only set by one layer is shared with
+    it, and only dicts set by several layers are built anew. Dicts equal to the one at the
+    same path of previous (eg. the last merged config) are replaced by it, so unchanged
+    subtrees are shared with previous, and can be recognised by identity.
+
+    None of layers, previous or the result may be modified afterwards.
+
+    Parameters
+    ----------
+    layers : list
+        Dicts to merge, eg. defaults followed by the config loaded from each source
+    previous : dict
+        Result of an earlier merge to share unchanged subtrees with
+    """
+    layers = [layer for layer in layers if layer]
+    if not layers:
+        return {} if previous is None else _share(previous, {})
+    return _merge_layers(layers, previous)
+
+
+def _merge_layers(layers, previous):
+    """Merge non-empty dicts layers, see `merge_layers`."""
+    if len(layers) == 1:
+        return _share(previous, layers[0])
+
+    if not isinstance(previous, Mapping):
+        previous = None
+    result = {}
+    unchanged = previous is not None
+    for index, layer in enumerate(layers):
+        for key in layer:
+            if key in result:
+                continue
+            values = [later[key] for later in layers[index:] if key in later]
+            if not isinstance(values[-1], Mapping):
+                values = values[-1:]
+            else:
+                # dicts replace any non-dict value before them, and what it replaced
+                for position in range(len(values) - 2, -1, -1):
+                    if not isinstance(values[position], Mapping):
+                        values = values[position + 1 :]
+                        break
+
+            old = previous.get(key, _MISSING) if previous is not None else _MISSING
+            if len(values) > 1:
+                value = _merge_layers(values, old)
+            else:
+                value = _share(old, values[0])
+            result[key] = value
+            unchanged = unchanged and value is old
+
+    if unchanged and len(result) == len(previous):
+        return previous
+    return result
+
+
+def merge_paths(layers, previous, paths):
+    """Return `merge_layers(layers, previous)`, re-merging only the values at paths.
+
+    For when previous was merged from layers which have since only changed at paths (and
+    below them), eg. the paths `changes.changed_paths` finds between the old and new
+    config of the one source which changed. Only the values at paths are merged again, and
+    only the dicts containing them are copied, so the cost scales with the size of the
+    change rather than of the config.
+
+    Parameters
+    ----------
+    layers : list
+        Dicts to merge, eg. defaults followed by the config loaded from each source
+    previous : dict
+        Result of merging layers before they changed
+    paths : list
+        Tuples of keys where layers changed
+    """
+    layers = [layer for layer in layers if layer]
+    config = previous
+    for path in _outermost(paths):
+        old = _get_in_default(previous, path)
+        value = _merged_at(layers, path, old)
+        if value is old:
+            continue
+        if value is _MISSING:
+            config = _dissoc_in(config, path)
+        else:
+            config = _assoc_in(config, path, value)
+    return config
+
+
+def _outermost(paths):
+    """Return the paths which are not nested in another one of paths."""
+    paths = sorted(set(tuple(path) for path in paths))
+    outermost = []
+    for path in paths:
+        if not outermost or path[: len(outermost[-1])] != outermost[-1]:
+            outermost.append(path)
+    return outermost
+
+
+def _merged_at(layers, path, old):
+    """Return the value at path of the merge of layers, or _MISSING, see `merge_paths`."""
+    candidates = layers
+    for depth, key in enumerate(path):
+        values = [layer[key] for layer in candidates if key in layer]
+        if not values:
+            return _MISSING
+        last = depth == len(path) - 1
+        if not isinstance(values[-1], Mapping):
+            # a non-dict value has nothing nested in it
+            return _share(old, values[-1]) if last else _MISSING
+        # dicts replace any non-dict value before them, and what it replaced
+        for position in range(len(values) - 2, -1, -1):
+            if not isinstance(values[position], Mapping):
+                values = values[position + 1 :]
+                break
+        if last:
+            if len(values) == 1:
+                return _share(old, values[0])
+            return _merge_layers(values, old)
+        candidates = values
+
+
+def _get_in_default(dic, path):
+    """Return the value at path in dic, or _MISSING."""
+    for key in path:
+        if not isinstance(dic, Mapping) or key not in dic:
+            return _MISSING
+        dic = dic[key]
+    return dic
+
+
+def _assoc_in(dic, path, value):
+    """Return a copy of dic with value at path, copying only the dicts along path."""
+    result = dict(dic)
+    current = dic.get(path[0])
+    if len(path) == 1:
+        result[path[0]] = value
+    else:
+        if not isinstance(current, Mapping):
+            current = {}
+        result[path[0]] = _assoc_in(current, path[1:], value)
+    return result
+
+
+def _dissoc_in(dic, path):
+    """Return a copy of dic without the value at path, or dic if path isn't in it."""
+    key = path[0]
+    if not isinstance(dic, Mapping) or key not in dic:
+        return dic
+    result = dict(dic)
+    if len(path) == 1:
+        del result[key]
+    else:
+        value = _dissoc_in(dic[key], path[1:])
+        if value is dic[key]:
+            return dic
+        result[key] = value
+    return result
+
+
+def _share(old, new):
+    """Return old if it is the same value as new, so unchanged values are shared."""
+    if old is new or (old is not _MISSING and same_value(old, new)):
+        return old
+    return new
+
+
+def same_value(old, new):
+    """Return whether old and new are equal, and so are the types of all their values.
+
+    Unlike ==, 0, 0.0 and False are not the same value, and neither are dicts or lists
+    holding them, so a config changing one for another is a change.
+    """
+    if old is new:
+        return True
+    if isinstance(old, Mapping) and isinstance(new, Mapping):
+        return len(old) == len(new) and all(
+            key in new and same_value(value, new[key]) for key, value in old.items()
+        )
+    if type(old) is not type(new):
+        return False
+    if isinstance(old, (list, tuple)):
+        return len(old) == len(new) and all(
+            same_value(old_item, new_item) for old_item, new_item in zip(old, new)
+        )
+    return old == new
+
+
+# Sentinel for missing values
+_MISSING = object()
+
+
 def get_in(dic, key):
     """Get maybe-nested value key from dic."""
     # Allow string or list keys
     if isinstance(key, str):
         return dic[key]
 
-    if len(key) == 1:
-        return dic[key[0]]
-    else:
-        return get_in(dic[key[0]], key[1:])
+    for part in key:
+        dic = dic[part]
+    return dic
 
 
 def set_in(dic, key, value):
@@ -39,9 +258,8 @@ def set_in(dic, key, value):
     if isinstance(key, str):
         dic[key] = value
     else:
-        if len(key) == 1:
-            dic[key[0]] = value
-        else:
-            if key[0] not in dic:
-                dic[key[0]] = {}
-            set_in(dic[key[0]], key[1:], value)
+        for part in key[:-1]:
+            if part not in dic:
+                dic[part] = {}
+            dic = dic[part]
+        dic[key[-1]] = value
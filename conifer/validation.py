@@ -0,0 +1,429 @@
+"""Compiled validation module for Conifer
+
+This module provides `compile_validator`, which compiles a JSON schema once into Python
+source specialized for it, and returns a `CompiledValidator` running that code. It is used
+to validate the whole configuration on every `Conifer.update_config`, where interpreting
+the schema with `Draft4Validator` each time is the most expensive step of a reload.
+
+The generated code is equivalent to Draft 4 for the keywords below. Subschemas using any
+other validation keyword, or a remote `$ref`, are checked by jsonschema instead. When the
+generated code finds the configuration invalid, `Draft4Validator` validates it again to
+raise the same ValidationError jsonschema always did.
+
+Compiled keywords: type, enum (of non-container values), minimum, maximum,
+exclusiveMinimum, exclusiveMaximum, minLength, maxLength, pattern, items (a single
+schema), minItems, maxItems, properties, required, additionalProperties, minProperties,
+maxProperties, allOf, anyOf, oneOf, not, format (which Draft4Validator ignores) and local
+`$ref`s.
+"""
+import numbers
+import re
+
+from .sources.schema_utils import resolve_pointer
+
+try:
+    _string_types = (str, unicode)
+    _integer_types = (int, long)
+except NameError:  # py3
+    _string_types = (str,)
+    _integer_types = (int,)
+
+# Expressions checking whether {v} has a JSON schema type, like Draft4Validator's
+_TYPE_CHECKS = {
+    "array": "isinstance({v}, list)",
+    "boolean": "isinstance({v}, bool)",
+    "integer": "(isinstance({v}, _integer_types) and not isinstance({v}, bool))",
+    "null": "{v} is None",
+    "number": "(isinstance({v}, numbers.Number) and not isinstance({v}, bool))",
+    "object": "isinstance({v}, dict)",
+    "string": "isinstance({v}, _string_types)",
+}
+
+# Draft 4 validation keywords which are compiled; all others are left to jsonschema
+_COMPILED_KEYWORDS = frozenset(
+    [
+        "$ref",
+        "additionalProperties",
+        "allOf",
+        "anyOf",
+        "enum",
+        "format",
+        "items",
+        "maxItems",
+        "maxLength",
+        "maxProperties",
+        "maximum",
+        "minItems",
+        "minLength",
+        "minProperties",
+        "minimum",
+        "not",
+        "oneOf",
+        "pattern",
+        "properties",
+        "required",
+        "type",
+    ]
+)
+
+# Deepest indent of generated code, well below python's limits on nesting
+_MAX_INDENT = 16
+
+# Compiled validators of recently used schemas, see `compile_validator`
+_compiled = {}
+_COMPILED_SIZE = 128
+
+
+def compile_validator(schema):
+    """Return a CompiledValidator for schema, re-using it for equal frozen schemas.
+
+    Parameters
+    ----------
+    schema : dict
+        JSONSchema Draft 4 schema, frozen if it should be re-used
+
+    Returns
+    -------
+    CompiledValidator
+    """
+    try:
+        return _compiled[schema]
+    except (KeyError, TypeError):
+        pass
+
+    validator = CompiledValidator(schema)
+    try:
+        if len(_compiled) >= _COMPILED_SIZE:
+            _compiled.clear()
+        _compiled[schema] = validator
+    except TypeError:
+        # unhashable, eg. a plain dict
+        pass
+    return validator
+
+
+class CompiledValidator(object):
+    """Validator running Python code generated for one schema.
+
+    Parameters
+    ----------
+    schema : dict
+        JSONSchema Draft 4 schema
+
+    Attributes
+    ----------
+    source : str
+        The generated Python source, for debugging
+    """
+
+    def __init__(self, schema):
+        from jsonschema import Draft4Validator
+        from pyrsistent import thaw
+
+        self.schema = thaw(schema)
+        self.validator = Draft4Validator(self.schema)
+
+        generator = _Generator(self.schema, self.validator)
+        self.source = generator.generate()
+        namespace = generator.namespace()
+        exec(compile(self.source, "<conifer compiled validator>", "exec"), namespace)
+        self._is_valid = namespace["_validate"]
+
+    def is_valid(self, instance):
+        """Return whether instance is valid."""
+        return self._is_valid(instance)
+
+    def validate(self, instance):
+        """Raise ValidationError if instance is invalid, like Draft4Validator.validate."""
+        if not self._is_valid(instance):
+            # report the same error as jsonschema would
+            self.validator.validate(instance)
+
+
+class _Generator(object):
+    """Generates the source of a `_validate(value)` function for a schema.
+
+    Every subschema is emitted inline as statements returning False on failure. Local
+    `$ref`s and the branches of anyOf, oneOf and not become separate functions.
+    """
+
+    def __init__(self, root, validator):
+        self.root = root
+        self.validator = validator
+        self.functions = []
+        # constants referenced by the generated code, by name
+        self.constants = {}
+        # maps local `$ref`s to the name of the function validating them
+        self.refs = {}
+        self.pending_refs = []
+        self.counter = 0
+
+    def generate(self):
+        self.function(self.root, "_validate")
+        while self.pending_refs:
+            name, schema = self.pending_refs.pop()
+            self.function(schema, name)
+        return "\n\n".join("\n".join(lines) for lines in self.functions) + "\n"
+
+    def namespace(self):
+        namespace = {
+            "numbers": numbers,
+            "_integer_types": _integer_types,
+            "_string_types": _string_types,
+            "_in_enum": _in_enum,
+        }
+        namespace.update(self.constants)
+        return namespace
+
+    def name(self, prefix):
+        self.counter += 1
+        return "{}{}".format(prefix, self.counter)
+
+    def constant(self, value):
+        name = self.name("_c")
+        self.constants[name] = value
+        return name
+
+    def function(self, schema, name=None):
+        """Emit a function validating schema, returning its name."""
+        name = name or self.name("_f")
+        lines = ["def {}(v0):".format(name)]
+        self.functions.append(lines)
+        self.emit(schema, "v0", lines, 1)
+        lines.append("    return True")
+        return name
+
+    def line(self, lines, indent, text):
+        lines.append("    " * indent + text)
+
+    def fail_unless(self, lines, indent, condition):
+        self.line(lines, indent, "if not ({}):".format(condition))
+        self.line(lines, indent + 1, "return False")
+
+    def emit(self, schema, var, lines, indent):
+        """Emit statements returning False unless the value in var is valid for schema."""
+        if schema == {}:
+            return
+        if indent > _MAX_INDENT:
+            # python limits nesting, continue in a new function
+            call = "{}({})".format(self.function(schema), var)
+            return self.fail_unless(lines, indent, call)
+        if not isinstance(schema, dict) or "id" in schema:
+            return self.fallback(schema, var, lines, indent)
+
+        if "$ref" in schema:
+            # Draft 4 ignores the siblings of `$ref`
+            name = self.ref_function(schema["$ref"])
+            if name is None:
+                return self.fallback(schema, var, lines, indent)
+            return self.fail_unless(lines, indent, "{}({})".format(name, var))
+
+        keywords = set(schema).intersection(self.validator.VALIDATORS)
+        if not keywords.issubset(_COMPILED_KEYWORDS) or not self.supported(schema):
+            return self.fallback(schema, var, lines, indent)
+
+        guaranteed = self.emit_type(schema, var, lines, indent)
+        self.emit_enum(schema, var, lines, indent)
+        self.emit_number(schema, var, lines, indent, guaranteed)
+        self.emit_string(schema, var, lines, indent, guaranteed)
+        self.emit_array(schema, var, lines, indent, guaranteed)
+        self.emit_object(schema, var, lines, indent, guaranteed)
+        self.emit_combinators(schema, var, lines, indent)
+
+    def supported(self, schema):
+        """Whether the compiled keywords of schema use only compiled forms."""
+        types = schema.get("type", [])
+        if isinstance(types, _string_types):
+            types = [types]
+        if not isinstance(types, list) or any(t not in _TYPE_CHECKS for t in types):
+            return False
+        if any(isinstance(value, (dict, list)) for value in schema.get("enum", [])):
+            return False
+        if "items" in schema and not isinstance(schema["items"], dict):
+            return False
+        additional = schema.get("additionalProperties", True)
+        return isinstance(additional, (bool, dict))
+
+    def fallback(self, schema, var, lines, indent):
+        """Emit a check of var against schema by jsonschema."""
+        from .conifer import _descend
+
+        is_valid = self.constant(_descend(self.validator, schema).is_valid)
+        self.fail_unless(lines, indent, "{}({})".format(is_valid, var))
+
+    def ref_function(self, ref):
+        """Return the name of the function validating a local `$ref`, or None."""
+        if not ref.startswith("#"):
+            return None
+        if ref not in self.refs:
+            try:
+                target = resolve_pointer(self.root, ref)
+            except (KeyError, IndexError, ValueError, TypeError):
+                return None
+            self.refs[ref] = self.name("_ref")
+            self.pending_refs.append((self.refs[ref], target))
+        return self.refs[ref]
+
+    def emit_type(self, schema, var, lines, indent):
+        """Emit the type check, returning the type var is guaranteed to have, if any."""
+        types = schema.get("type")
+        if types is None:
+            return None
+        if isinstance(types, _string_types):
+            types = [types]
+        condition = " or ".join(_TYPE_CHECKS[name].format(v=var) for name in types)
+        self.fail_unless(lines, indent, condition)
+        return types[0] if len(types) == 1 else None
+
+    def emit_enum(self, schema, var, lines, indent):
+        if "enum" in schema:
+            enum = self.constant(tuple(schema["enum"]))
+            self.fail_unless(lines, indent, "_in_enum({}, {})".format(var, enum))
+
+    def emit_number(self, schema, var, lines, indent, guaranteed):
+        checks = []
+        if "minimum" in schema:
+            operator = ">" if schema.get("exclusiveMinimum", False) else ">="
+            checks.append("{{v}} {} {!r}".format(operator, schema["minimum"]))
+        if "maximum" in schema:
+            operator = "<" if schema.get("exclusiveMaximum", False) else "<="
+            checks.append("{{v}} {} {!r}".format(operator, schema["maximum"]))
+        self.emit_guarded(checks, var, lines, indent, guaranteed, ["number"])
+
+    def emit_string(self, schema, var, lines, indent, guaranteed):
+        checks = []
+        if "minLength" in schema:
+            checks.append("len({{v}}) >= {!r}".format(schema["minLength"]))
+        if "maxLength" in schema:
+            checks.append("len({{v}}) <= {!r}".format(schema["maxLength"]))
+        if "pattern" in schema:
+            pattern = self.constant(re.compile(schema["pattern"]))
+            checks.append("{}.search({{v}}) is not None".format(pattern))
+        self.emit_guarded(checks, var, lines, indent, guaranteed, ["string"])
+
+    def emit_guarded(self, checks, var, lines, indent, guaranteed, types):
+        """Emit checks, which only apply to values of types."""
+        if not checks:
+            return
+        indent = self.guard(lines, indent, guaranteed, types, var)
+        for check in checks:
+            self.fail_unless(lines, indent, check.format(v=var))
+
+    def emit_array(self, schema, var, lines, indent, guaranteed):
+        keywords = [k for k in ("items", "minItems", "maxItems") if k in schema]
+        if not keywords:
+            return
+        indent = self.guard(lines, indent, guaranteed, ["array"], var)
+        if "minItems" in schema:
+            self.fail_unless(
+                lines, indent, "len({}) >= {!r}".format(var, schema["minItems"])
+            )
+        if "maxItems" in schema:
+            self.fail_unless(
+                lines, indent, "len({}) <= {!r}".format(var, schema["maxItems"])
+            )
+        if "items" in schema and schema["items"] != {}:
+            item = self.name("v")
+            self.line(lines, indent, "for {} in {}:".format(item, var))
+            self.emit(schema["items"], item, lines, indent + 1)
+        self.close_block(lines)
+
+    def emit_object(self, schema, var, lines, indent, guaranteed):
+        keywords = [
+            k
+            for k in (
+                "properties",
+                "required",
+                "additionalProperties",
+                "minProperties",
+                "maxProperties",
+            )
+            if k in schema
+        ]
+        if not keywords:
+            return
+        indent = self.guard(lines, indent, guaranteed, ["object"], var)
+
+        if "minProperties" in schema:
+            self.fail_unless(
+                lines, indent, "len({}) >= {!r}".format(var, schema["minProperties"])
+            )
+        if "maxProperties" in schema:
+            self.fail_unless(
+                lines, indent, "len({}) <= {!r}".format(var, schema["maxProperties"])
+            )
+        for key in schema.get("required", []):
+            self.fail_unless(lines, indent, "{!r} in {}".format(key, var))
+
+        properties = schema.get("properties", {})
+        for key, subschema in properties.items():
+            if subschema == {}:
+                continue
+            value = self.name("v")
+            self.line(lines, indent, "if {!r} in {}:".format(key, var))
+            self.line(lines, indent + 1, "{} = {}[{!r}]".format(value, var, key))
+            self.emit(subschema, value, lines, indent + 1)
+
+        additional = schema.get("additionalProperties", True)
+        if additional is True or additional == {}:
+            return self.close_block(lines)
+        known = self.constant(frozenset(properties))
+        key = self.name("k")
+        self.line(lines, indent, "for {} in {}:".format(key, var))
+        self.line(lines, indent + 1, "if {} not in {}:".format(key, known))
+        if additional is False:
+            self.line(lines, indent + 2, "return False")
+        else:
+            value = self.name("v")
+            self.line(lines, indent + 2, "{} = {}[{}]".format(value, var, key))
+            self.emit(additional, value, lines, indent + 2)
+
+    def close_block(self, lines):
+        """Emit a pass into the block opened by the last line, if nothing was emitted in it.
+
+        Keywords may open a block (eg. a type guard or a loop) before finding that their
+        subschemas check nothing, eg. `{'properties': {'key': {}}}`.
+        """
+        last = lines[-1]
+        if last.endswith(":"):
+            self.line(lines, (len(last) - len(last.lstrip())) // 4 + 1, "pass")
+
+    def guard(self, lines, indent, guaranteed, types, var):
+        """Emit a check that var has one of types, unless guaranteed. Returns the indent."""
+        if guaranteed in types or (guaranteed == "integer" and "number" in types):
+            return indent
+        condition = " or ".join(_TYPE_CHECKS[name].format(v=var) for name in types)
+        self.line(lines, indent, "if {}:".format(condition))
+        return indent + 1
+
+    def emit_combinators(self, schema, var, lines, indent):
+        for subschema in schema.get("allOf", []):
+            self.emit(subschema, var, lines, indent)
+        if "anyOf" in schema:
+            calls = self.calls(schema["anyOf"], var)
+            self.fail_unless(lines, indent, " or ".join(calls))
+        if "oneOf" in schema:
+            calls = self.calls(schema["oneOf"], var)
+            self.fail_unless(lines, indent, "{} == 1".format(" + ".join(calls)))
+        if "not" in schema:
+            call = self.calls([schema["not"]], var)[0]
+            self.line(lines, indent, "if {}:".format(call))
+            self.line(lines, indent + 1, "return False")
+
+    def calls(self, schemas, var):
+        """Return calls of new functions validating var against each of schemas."""
+        return ["{}({})".format(self.function(schema), var) for schema in schemas]
+
+
+def _in_enum(value, enum):
+    """Whether value equals a member of enum, which holds no dicts or lists.
+
+    Like jsonschema, booleans are never equal to numbers.
+    """
+    if isinstance(value, (dict, list)):
+        return False
+    is_bool = isinstance(value, bool)
+    for member in enum:
+        if member == value and isinstance(member, bool) == is_bool:
+            return True
+    return False
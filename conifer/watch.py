@@ -0,0 +1,277 @@
+"""File watching module for Conifer
+
+This module provides the `ConfigWatcher`, which reloads a Conifer whenever the files behind
+its sources change. Sources advertise the files they read with a `watch_paths()` method.
+
+Files are watched with inotify where it is available (Linux), falling back to polling
+their stat info otherwise.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+
+
+class ConfigWatcher(object):
+    """Reload a Conifer when the files behind its sources change.
+
+    Changes are debounced and coalesced: once a file changes, the watcher waits until no
+    watched file has changed for `debounce` seconds, then calls `update_config` once, only
+    re-loading the sources whose files changed. An editor's write-rename burst causes a
+    single reload.
+
+    Errors raised while reloading are kept in `last_error`; the Conifer keeps its last
+    good configuration.
+
+    Parameters
+    ----------
+    conf : Conifer
+        The Conifer to reload
+
+    Kwargs
+    ------
+    debounce : float
+        Seconds to wait for changes to settle before reloading
+    poll_interval : float
+        Seconds between stat checks when polling
+    use_inotify : bool (True)
+        Use inotify where it is available. Otherwise always poll.
+    """
+
+    def __init__(self, conf, debounce=0.1, poll_interval=1.0, use_inotify=True):
+        self._conf = conf
+        self._debounce = debounce
+        self._poll_interval = poll_interval
+        self._use_inotify = use_inotify
+
+        # Maps each watched path to the sources reading it
+        self._sources_by_path = {}
+        for source in conf._sources:
+            watch_paths = getattr(source, "watch_paths", None)
+            if watch_paths is None:
+                continue
+            for path in watch_paths():
+                self._sources_by_path.setdefault(path, []).append(source)
+
+        self._stop = threading.Event()
+        self._thread = None
+        self.reload_count = 0
+        self.last_error = None
+
+    def start(self):
+        """Start watching in a daemon thread.
+
+        Changes made after `start` returns are always seen.
+        """
+        if self._thread is not None:
+            raise RuntimeError("ConfigWatcher is already running")
+        if not self._sources_by_path:
+            return
+
+        # set up the backend before returning, so no change can be missed
+        backend = None
+        if self._use_inotify:
+            try:
+                backend = _Inotify(self._sources_by_path)
+            except OSError:
+                # fall back to polling
+                pass
+        if backend is None:
+            backend = _StatPoller(self._sources_by_path)
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(backend,), name="conifer-watcher"
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching, waiting for any in-progress reload to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        if self._thread is None:
+            self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self, backend):
+        try:
+            if isinstance(backend, _Inotify):
+                self._watch(backend.read_changes, self._poll_interval)
+            else:
+                self._watch(backend.read_changes, 0)
+        finally:
+            backend.close()
+
+    def _watch(self, read_changes, wait):
+        """Watch loop shared by the inotify and polling backends.
+
+        read_changes(timeout) returns the set of changed paths, blocking for up to timeout
+        seconds. Backends that can't block are called every poll_interval seconds.
+        """
+        while not self._stop.is_set():
+            changed = read_changes(wait)
+            if not changed:
+                if not wait:
+                    self._stop.wait(self._poll_interval)
+                continue
+
+            # coalesce until the burst of changes settles
+            while not self._stop.is_set():
+                if not wait:
+                    self._stop.wait(self._debounce)
+                more_changes = read_changes(self._debounce if wait else 0)
+                if not more_changes:
+                    break
+                changed |= more_changes
+
+            if not self._stop.is_set():
+                self._reload(changed)
+
+    def _reload(self, changed_paths):
+        sources = []
+        for path in changed_paths:
+            for source in self._sources_by_path.get(path, []):
+                if not any(source is seen for seen in sources):
+                    sources.append(source)
+        # lazy sources which weren't loaded yet read the current file on first access
+        deferred = [
+            self._conf._sources[index] for index in self._conf._deferred_indexes()
+        ]
+        sources = [
+            source for source in sources if not any(source is lazy for lazy in deferred)
+        ]
+        if not sources:
+            return
+
+        try:
+            self._conf.update_config(sources=sources)
+        except Exception as exc:
+            self.last_error = exc
+        else:
+            self.last_error = None
+            self.reload_count += 1
+
+
+class _StatPoller(object):
+    """Detects changed files by comparing their stat info."""
+
+    def __init__(self, paths):
+        self._stats = dict((path, _stat(path)) for path in paths)
+
+    def read_changes(self, timeout=0):
+        changed = set()
+        for path, last_stat in self._stats.items():
+            current_stat = _stat(path)
+            if current_stat != last_stat:
+                self._stats[path] = current_stat
+                changed.add(path)
+        return changed
+
+    def close(self):
+        pass
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (getattr(stat, "st_mtime_ns", stat.st_mtime), stat.st_size, stat.st_ino)
+
+
+# inotify(7) constants
+_IN_MODIFY = 0x2
+_IN_ATTRIB = 0x4
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify(object):
+    """Minimal ctypes binding to inotify, watching the directories of the given files.
+
+    Directories are watched, rather than the files, so atomic replace-by-rename is seen.
+
+    Raises OSError if inotify is not available.
+    """
+
+    def __init__(self, paths):
+        library = ctypes.util.find_library("c")
+        if library is None:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify not available")
+
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self._paths = set(paths)
+        self._directories = {}
+        try:
+            for directory in set(os.path.dirname(path) for path in paths):
+                watch = libc.inotify_add_watch(
+                    self._fd, directory.encode("utf-8"), _WATCH_MASK
+                )
+                if watch < 0:
+                    raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+                self._directories[watch] = directory
+        except OSError:
+            self.close()
+            raise
+
+    def read_changes(self, timeout):
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except OSError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            watch, _, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + name_length].rstrip(b"\0")
+            offset += name_length
+
+            directory = self._directories.get(watch)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name.decode("utf-8"))
+            if path in self._paths:
+                changed.add(path)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
@@ -1,7 +1,12 @@
+import sys
+
 import pytest
 
 from conifer import Conifer
 
+# async syntax and asyncio.run need py3.7+
+collect_ignore = ["test_async.py"] if sys.version_info < (3, 7) else []
+
 
 TEST_SCHEMA = {
     "$schema": "http://json-schema.org/draft-04/schema",
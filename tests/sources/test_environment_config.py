@@ -0,0 +1,26 @@
+from conifer.sources.environment_config import EnvironmentConfigLoader
+from conifer.sources.schema_utils import SchemaPlan
+
+import pytest
+
+
+def test_environment_config(test_schema, monkeypatch):
+    monkeypatch.setenv("MYAPP_foo", "from env")
+    monkeypatch.setenv("MYAPP_bar_more_nested_subkey", "5")
+    monkeypatch.setenv("bar_nested", "no prefix")
+    loader = EnvironmentConfigLoader(prefix="MYAPP_")
+
+    assert loader.load_config(SchemaPlan(test_schema)) == {
+        "foo": "from env",
+        "bar": {"more_nested": {"subkey": 5}},
+    }
+    assert loader.unknown_variables == []
+
+
+def test_environment_config_unknown(test_schema, monkeypatch):
+    monkeypatch.setenv("MYAPP_fooo", "typo")
+    loader = EnvironmentConfigLoader(prefix="MYAPP_")
+
+    with pytest.warns(UserWarning, match="MYAPP_fooo"):
+        assert loader.load_config(SchemaPlan(test_schema)) == {}
+    assert loader.unknown_variables == ["MYAPP_fooo"]
@@ -1,11 +1,14 @@
 import json
+import os
 
 try:
     from StringIO import StringIO
 except ImportError:
     from io import StringIO
 
+from conifer import Conifer
 from conifer.sources.json_file import JSONFileLoader
+from conifer.sources.schema_utils import SchemaPlan
 
 import pytest
 
@@ -30,3 +33,39 @@ def open_json_file():
 def test_json_file(open_json_file):
     loader = JSONFileLoader(fp=open_json_file)
     assert loader._data == TEST_DATA
+
+
+def test_json_file_reload(tmp_path, test_schema, mocker):
+    path = tmp_path / "conf.json"
+    path.write_text(json.dumps(TEST_DATA))
+    conf = Conifer(test_schema, sources=[JSONFileLoader(path=str(path))])
+    assert conf["foo"] == "fffff"
+
+    parse = mocker.spy(json, "load")
+    conf.update_config()
+    # unchanged file isn't parsed again
+    assert parse.call_count == 0
+
+    path.write_text(json.dumps({"foo": "changed"}))
+    conf.update_config()
+    assert conf["foo"] == "changed"
+    assert parse.call_count == 1
+
+
+def test_json_file_checksum(tmp_path, test_schema):
+    path = tmp_path / "conf.json"
+    path.write_text(json.dumps(TEST_DATA))
+    loader = JSONFileLoader(path=str(path), checksum=True)
+    plan = SchemaPlan(test_schema)
+
+    partial_config = loader.load_config(plan)
+    data = loader._data
+    os.utime(str(path), (0, 0))
+    # only touched, not changed
+    assert loader.load_config(plan) == partial_config
+    assert loader._data is data
+
+
+def test_json_file_missing(tmp_path, test_schema):
+    loader = JSONFileLoader(path=str(tmp_path / "missing.json"))
+    assert loader.load_config(test_schema) == {}
@@ -0,0 +1,137 @@
+"""Tests of the asyncio support, which needs py3.7+, see conftest.py."""
+import asyncio
+import threading
+import time
+
+from conifer import Conifer
+from conifer.conifer import _ThreadLocalVar
+from conifer.refresh import Refresher
+from conifer.sources import DictLoader
+
+from tests.test_concurrent_loading import SlowLoader
+from tests.test_refresh import FlakyLoader
+
+import pytest
+
+
+class AsyncLoader(DictLoader):
+    def __init__(self, data):
+        super(AsyncLoader, self).__init__(data)
+        self.loaded_on = None
+
+    async def load_config_async(self, schema):
+        await asyncio.sleep(0.01)
+        self.loaded_on = threading.current_thread()
+        return self.load_config(schema)
+
+
+def test_update_config_async(test_schema):
+    async_loader = AsyncLoader({"foo": "async"})
+    conf = Conifer(
+        test_schema,
+        sources=[async_loader, SlowLoader({"bar": {"nested": "slow"}}, delay=0.01)],
+        skip_load_on_init=True,
+    )
+
+    asyncio.run(conf.update_config_async())
+
+    assert conf["foo"] == "async"
+    assert conf["bar"]["nested"] == "slow"
+    assert async_loader.loaded_on is threading.main_thread()
+
+
+def test_update_config_async_cancelled(test_schema):
+    conf = Conifer(test_schema, sources=[DictLoader({"foo": "loaded"})])
+    lock = conf._update_lock
+
+    async def cancel_while_acquiring():
+        lock.acquire()
+        task = asyncio.ensure_future(conf.update_config_async())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        lock.release()
+        await asyncio.sleep(0.05)
+        return task.cancelled()
+
+    assert asyncio.run(cancel_while_acquiring())
+    assert not lock.locked()
+
+    published = threading.Event()
+    publish = conf._publish
+
+    def slow_publish(*args):
+        time.sleep(0.1)
+        changes = publish(*args)
+        published.set()
+        return changes
+
+    conf._publish = slow_publish
+
+    async def cancel_while_publishing():
+        task = asyncio.ensure_future(conf.update_config_async())
+        await asyncio.sleep(0.02)
+        task.cancel()
+        await asyncio.sleep(0)
+        # still held by the publishing thread
+        assert lock.locked()
+        await asyncio.sleep(0.2)
+        return task.cancelled()
+
+    assert asyncio.run(cancel_while_publishing())
+    assert published.is_set()
+    assert not lock.locked()
+
+
+def test_update_config_async_changes(test_schema):
+    source = DictLoader({})
+    conf = Conifer(test_schema, sources=[source])
+    called = []
+    conf.subscribe("foo", called.append)
+
+    source._data = {"foo": "changed"}
+    changes = asyncio.run(conf.update_config_async())
+    assert list(changes) == [("foo",)]
+    assert len(called) == 1
+
+
+def test_refresher_async(test_schema):
+    loader = FlakyLoader({"foo": "first"})
+    conf = Conifer(test_schema, sources=[loader])
+    refresher = Refresher(conf, interval=0.01)
+
+    async def refresh():
+        refresher.start_async()
+        loader._data = {"foo": "second"}
+        while conf["foo"] != "second":
+            await asyncio.sleep(0.01)
+        refresher.stop()
+
+    asyncio.run(asyncio.wait_for(refresh(), 5))
+    assert refresher.stats.refreshes
+
+
+def test_scoped_tasks(conf):
+    async def handler(value):
+        async with conf.scoped({"foo": value}):
+            await asyncio.sleep(0.01)
+            return conf.foo
+
+    async def main():
+        return await asyncio.gather(handler("a"), handler("b"))
+
+    assert asyncio.run(main()) == ["a", "b"]
+    assert conf.foo == "bar"
+
+
+def test_scoped_tasks_thread_local(conf):
+    # the stand-in for contextvars before py3.7
+    conf._scoped = _ThreadLocalVar()
+
+    async def handler():
+        async with conf.scoped({"foo": "scoped"}):
+            pass
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(handler())
+    with conf.scoped({"foo": "scoped"}):
+        assert conf.foo == "scoped"
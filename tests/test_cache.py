@@ -0,0 +1,115 @@
+import json
+
+from conifer import Conifer
+from conifer.sources import DictLoader, EnvironmentConfigLoader, JSONFileLoader
+
+
+class UncacheableLoader(DictLoader):
+    cache_fingerprint = None
+
+
+def test_cache(test_schema, tmpdir, monkeypatch, mocker):
+    config_path = tmpdir.join("config.json")
+    config_path.write(json.dumps({"foo": "from file"}))
+    cache_path = str(tmpdir.join("cache"))
+
+    def make_conf():
+        return Conifer(
+            test_schema,
+            sources=[JSONFileLoader(str(config_path)), EnvironmentConfigLoader()],
+            derivations={
+                "derived": {"parameters": ["foo"], "derivation": lambda foo: foo.upper()}
+            },
+            cache_path=cache_path,
+        )
+
+    first = make_conf()
+    assert first.derived == "FROM FILE"
+
+    validate_schema = mocker.patch("conifer.conifer._validate_schema")
+    parse = mocker.spy(json, "load")
+    cached = make_conf()
+    assert not validate_schema.called
+    # the file is unchanged, so it isn't read either
+    assert parse.call_count == 0
+    assert cached.as_dict() == first.as_dict()
+    assert cached.snapshot().generation == 1
+
+    # partial reloads still work on top of the cached sources
+    monkeypatch.setenv("bar_nested", "from env")
+    cached.update_config(sources=[cached._sources[1]])
+    assert cached.foo == "from file"
+    assert cached.bar.nested == "from env"
+
+    # changed environment misses the cache
+    conf = make_conf()
+    assert validate_schema.called
+    assert conf.bar.nested == "from env"
+
+    # so does a changed file
+    config_path.write(json.dumps({"foo": "changed file!"}))
+    assert make_conf().foo == "changed file!"
+
+
+def test_cache_uncacheable(test_schema, tmpdir):
+    cache_path = tmpdir.join("cache")
+    conf = Conifer(
+        test_schema,
+        sources=[UncacheableLoader({"foo": "x"})],
+        cache_path=str(cache_path),
+    )
+    assert conf.foo == "x"
+    assert not cache_path.exists()
+
+
+def test_cache_corrupt(test_schema, tmpdir):
+    cache_path = tmpdir.join("cache")
+    cache_path.write("garbage")
+    conf = Conifer(
+        test_schema, sources=[DictLoader({"foo": "x"})], cache_path=str(cache_path)
+    )
+    assert conf.foo == "x"
+    assert Conifer(
+        test_schema, sources=[DictLoader({"foo": "y"})], cache_path=str(cache_path)
+    ).foo == "y"
+
+
+FINGERPRINT_SCRIPT = """
+import sys
+from conifer import Conifer
+from conifer.cache import ConfigCache
+from conifer.sources import DictLoader, EnvironmentConfigLoader, LazySource
+from tests.conftest import TEST_SCHEMA
+
+plan = Conifer(TEST_SCHEMA, sources=[]).plan
+sources = [
+    DictLoader({"foo": "x", "tags": {"a", "b", "c"}}),
+    LazySource(DictLoader({"bar": {"nested": "y"}}), ["bar"]),
+    EnvironmentConfigLoader(),
+]
+sys.stdout.write(ConfigCache("unused").fingerprint(plan, sources, {"foo": "z"}))
+"""
+
+
+def test_cache_fingerprint_stable():
+    import os
+    import subprocess
+    import sys
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    fingerprints = [
+        subprocess.check_output(
+            [sys.executable, "-c", FINGERPRINT_SCRIPT],
+            cwd=root,
+            env=dict(os.environ, PYTHONHASHSEED=str(seed)),
+        )
+        for seed in (1, 2)
+    ]
+    assert fingerprints[0] and fingerprints[0] == fingerprints[1]
+
+
+def test_cache_fingerprint_unknown_values(test_schema):
+    from conifer.cache import ConfigCache
+
+    cache = ConfigCache("unused")
+    assert cache.fingerprint(test_schema, [DictLoader({"foo": object()})], None) is None
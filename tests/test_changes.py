@@ -0,0 +1,123 @@
+import threading
+import time
+
+from conifer import Conifer
+from conifer.changes import ChangeSet, changed_paths
+from conifer.sources import DictLoader
+
+import pytest
+
+
+def test_changed_paths():
+    shared = {"x": 1}
+    old = {"a": {"b": 1, "c": 2}, "d": shared, "e": 1}
+    new = {"a": {"b": 1, "c": 3}, "d": shared, "e": {"f": 1}, "g": 1}
+    assert sorted(changed_paths(old, new)) == [("a", "c"), ("e",), ("g",)]
+    assert sorted(changed_paths({"a": 0, "b": [1]}, {"a": False, "b": [1.0]})) == [
+        ("a",),
+        ("b",),
+    ]
+
+
+def test_changes_of_type():
+    source = DictLoader({"flag": 0})
+    conf = Conifer({"properties": {"flag": {}}}, sources=[source])
+    notified = []
+    conf.subscribe("flag", notified.append)
+
+    source._data = {"flag": False}
+    changes = conf.update_config()
+    assert list(changes) == [("flag",)]
+    assert conf.flag is False
+    assert len(notified) == 1
+
+
+def test_update_config_changes(test_schema):
+    source = DictLoader({"foo": "first"})
+    conf = Conifer(test_schema, sources=[source])
+
+    assert not conf.update_config()
+
+    source._data = {"foo": "first", "bar": {"nested": "changed"}}
+    changes = conf.update_config()
+    assert isinstance(changes, ChangeSet)
+    assert list(changes) == [("bar", "nested")]
+    assert changes.affects("bar.")
+    assert changes.affects(["bar", "nested"])
+    assert not changes.affects("bar.more_nested")
+    assert changes.old.bar.nested == "baz"
+    assert changes.new.bar.nested == "changed"
+
+
+def test_subscribe(test_schema):
+    source = DictLoader({})
+    conf = Conifer(test_schema, sources=[source])
+    bar_changes = []
+    all_changes = []
+    conf.subscribe("bar.", bar_changes.append)
+    unsubscribe = conf.subscribe("", all_changes.append)
+
+    source._data = {"foo": "changed"}
+    conf.update_config()
+    assert bar_changes == []
+    assert [list(changes) for changes in all_changes] == [[("foo",)]]
+
+    unsubscribe()
+    source._data = {"foo": "changed", "bar": {"more_nested": {"subkey": 2}}}
+    conf.update_config()
+    assert [list(changes) for changes in bar_changes] == [
+        [("bar", "more_nested", "subkey")]
+    ]
+    assert len(all_changes) == 1
+
+
+def test_subscribers_notified_in_order(test_schema):
+    source = DictLoader({"foo": "0"})
+    conf = Conifer(test_schema, sources=[source])
+    notified = []
+    reloading = threading.Event()
+
+    def slow_subscriber(changes):
+        if changes.new.foo == "1":
+            # another thread reloads while this one is notifying
+            reloading.set()
+            time.sleep(0.1)
+        elif changes.new.foo == "2":
+            # and so does this callback
+            source._data = {"foo": "3"}
+            conf.update_config()
+        notified.append(changes.new.generation)
+
+    conf.subscribe("foo", slow_subscriber)
+
+    def reload_later():
+        reloading.wait()
+        source._data = {"foo": "2"}
+        conf.update_config()
+
+    thread = threading.Thread(target=reload_later)
+    thread.start()
+    source._data = {"foo": "1"}
+    conf.update_config()
+    thread.join()
+
+    assert notified == [2, 3, 4]
+    assert conf.foo == "3"
+
+
+def test_subscriber_errors(test_schema):
+    source = DictLoader({})
+    conf = Conifer(test_schema, sources=[source])
+    called = []
+
+    def fail(changes):
+        raise RuntimeError("subscriber failed")
+
+    conf.subscribe("foo", fail)
+    conf.subscribe("foo", called.append)
+
+    source._data = {"foo": "changed"}
+    with pytest.raises(RuntimeError):
+        conf.update_config()
+    assert len(called) == 1
+    assert conf.foo == "changed"
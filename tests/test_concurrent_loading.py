@@ -0,0 +1,47 @@
+import time
+
+from conifer import Conifer
+from conifer.sources import DictLoader
+
+import pytest
+
+
+class SlowLoader(DictLoader):
+    """DictLoader taking a while to load, like a source doing I/O."""
+
+    def __init__(self, data, delay=0.2):
+        super(SlowLoader, self).__init__(data)
+        self._delay = delay
+
+    def load_config(self, schema):
+        time.sleep(self._delay)
+        return super(SlowLoader, self).load_config(schema)
+
+
+def test_concurrent_loading(test_schema):
+    sources = [SlowLoader({"foo": "first"}), SlowLoader({"foo": "second"})]
+    sources += [SlowLoader({"bar": {"nested": str(index)}}) for index in range(3)]
+
+    start = time.time()
+    conf = Conifer(test_schema, sources=sources, max_workers=5)
+
+    assert time.time() - start < 0.2 * len(sources)
+    # still merged in declared order
+    assert conf["foo"] == "second"
+
+
+def test_close(test_schema):
+    sources = [SlowLoader({"foo": "first"}, delay=0), SlowLoader({}, delay=0)]
+    conf = Conifer(test_schema, sources=sources, max_workers=2)
+    executor = conf._executor
+    assert executor is not None
+
+    conf.close()
+    assert conf._executor is None
+    with pytest.raises(RuntimeError):
+        executor.submit(int)
+    # a new pool is started when needed
+    sources[0]._data = {"foo": "second"}
+    conf.update_config()
+    assert conf.foo == "second"
+    conf.close()
@@ -3,6 +3,16 @@
 See conftest.py for fixtures.
 """
 
+import copy
+import json
+
+from jsonschema import ValidationError
+
+from conifer import Conifer
+from conifer.sources import EnvironmentConfigLoader
+
+import pytest
+
 
 def test_basic_default(conf):
     assert conf["foo"] == "bar"
@@ -37,3 +47,218 @@ def test_nested_env(conf_env_patch):
 def test_more_nested_env(conf_env_patch):
     assert conf_env_patch["bar"]["more_nested"]["subkey"] == 2
     assert conf_env_patch.bar.more_nested.subkey == 2
+
+
+def test_override_shares_plan(conf):
+    assert conf.override(sources=[]).plan is conf.plan
+
+
+def test_snapshot(conf, monkeypatch):
+    snapshot = conf.snapshot()
+    monkeypatch.setenv("bar_nested", "reloaded")
+    conf.update_config()
+
+    # held snapshots never change
+    assert snapshot["bar"]["nested"] == "baz"
+    assert conf.snapshot().generation == snapshot.generation + 1
+    assert conf["bar"]["nested"] == "reloaded"
+    assert conf.snapshot().get_in(["bar", "nested"]) == "reloaded"
+
+
+def test_as_dict_copy(conf, monkeypatch):
+    snapshot = conf.snapshot()
+    snapshot.as_dict()["bar"]["nested"] = "modified"
+    conf.as_dict()["bar"]["more_nested"]["subkey"] = 5
+
+    monkeypatch.setenv("foo", "reloaded")
+    conf.update_config()
+    assert snapshot["bar"]["nested"] == "baz"
+    assert conf.bar.nested == "baz"
+    assert conf.bar.more_nested.subkey == 1
+
+
+def test_attribute_views(conf, monkeypatch):
+    # views are cached for each snapshot
+    assert conf.bar is conf.bar
+    assert conf.bar.more_nested is conf.bar.more_nested
+    assert conf.bar == {"nested": "baz", "more_nested": {"subkey": 1}}
+
+    assert isinstance(conf.bar, dict)
+    assert json.loads(json.dumps(conf.bar)) == conf.bar
+    assert copy.deepcopy(conf.bar) == conf.bar
+
+    # re-used by later snapshots sharing the subtree
+    view = conf.bar
+    conf.update_config()
+    assert conf.bar is view
+    monkeypatch.setenv("bar_nested", "changed")
+    conf.update_config()
+    assert conf.bar is not view
+    assert conf.bar.more_nested is view.more_nested
+
+
+def test_handle(conf, monkeypatch):
+    subkey = conf.handle("bar.more_nested.subkey")
+    assert subkey() == 1
+    assert conf.handle(["bar", "more_nested"])() == {"subkey": 1}
+
+    # handles always read the latest snapshot
+    monkeypatch.setenv("bar_more_nested_subkey", "3")
+    conf.update_config()
+    assert subkey() == 3
+
+
+def test_handle_undefined(conf):
+    with pytest.raises(KeyError):
+        conf.handle("bar.not_in_schema")
+
+
+def test_get_in(conf):
+    assert conf.get_in(["bar", "more_nested", "subkey"]) == 1
+    assert conf.get_in(["bar", "missing"], "default") == "default"
+
+
+def test_override(conf, monkeypatch):
+    monkeypatch.setenv("OVERRIDE_bar_nested", "overridden")
+    new_conf = conf.override(sources=[EnvironmentConfigLoader(prefix="OVERRIDE_")])
+
+    assert new_conf["bar"]["nested"] == "overridden"
+    assert conf["bar"]["nested"] == "baz"
+    # sections which aren't overridden are shared, not copied
+    assert new_conf._config["array_thing"] is conf._config["array_thing"]
+    assert new_conf._config["bar"]["more_nested"] is conf._config["bar"]["more_nested"]
+
+
+def test_read_only(conf, monkeypatch):
+    earlier = conf.snapshot()
+    override = conf.override(sources=[])
+    for modify in [
+        lambda: conf["bar"].__setitem__("nested", "modified"),
+        lambda: conf.bar.more_nested.update(subkey=2),
+        lambda: conf.array_thing.some_prop.append(2),
+        lambda: conf.snapshot()["array_thing"]["some_prop"].__setitem__(0, 2),
+        lambda: conf.get_in(["bar"]).pop("nested"),
+    ]:
+        with pytest.raises(TypeError):
+            modify()
+
+    conf.update_config()
+    assert conf.as_dict() == earlier.as_dict() == override.as_dict()
+    assert isinstance(conf.array_thing.some_prop, list)
+    # copies are plain and modifiable
+    copied = conf.as_dict()
+    copied["bar"]["nested"] = "modified"
+    assert copy.deepcopy(conf.bar)["more_nested"].pop("subkey") == 1
+    assert conf.bar.nested == "baz"
+
+
+class RawLoader(object):
+    """Source returning its data as is, without coercing or validating it."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def load_config(self, schema):
+        return self.data
+
+
+def test_override_invalid(conf):
+    with pytest.raises(ValidationError):
+        conf.override(sources=[RawLoader({"bar": {"more_nested": {"subkey": "x"}}})])
+
+
+def test_schema_validation_memoized(test_schema, mocker):
+    from conifer import Conifer, conifer
+
+    Conifer(test_schema)
+    metaschema_validator = mocker.spy(conifer, "_metaschema_validator")
+    Conifer(test_schema)
+    assert not metaschema_validator.called
+
+    with pytest.raises(ValueError):
+        Conifer({"type": "object"})
+    with pytest.raises(ValidationError):
+        Conifer({"properties": {"foo": {"type": "not a type"}}})
+
+
+def test_incremental_validation(test_schema, mocker):
+    from conifer import Conifer
+    from conifer.validation import CompiledValidator
+
+    source = RawLoader({"foo": "first"})
+    conf = Conifer(test_schema, sources=[source])
+    full_validation = mocker.spy(CompiledValidator, "validate")
+
+    source.data = {"foo": "second", "bar": {"more_nested": {"subkey": 2}}}
+    conf.update_config()
+    assert conf.bar.more_nested.subkey == 2
+    assert not full_validation.called
+
+    source.data = {"bar": {"more_nested": {"subkey": "x"}}}
+    with pytest.raises(ValidationError):
+        conf.update_config()
+    assert conf.foo == "second"
+
+    # cross-key constraints on an ancestor validate it whole
+    source.data = {"foo": "x"}
+    conf = Conifer(dict(test_schema, additionalProperties=True), sources=[source])
+    full_validation.reset_mock()
+    source.data = {"foo": "y"}
+    conf.update_config()
+    assert full_validation.called
+
+
+def test_validation_targets(test_schema):
+    from conifer.conifer import _validation_targets
+
+    schema = dict(test_schema)
+    schema["properties"] = dict(schema["properties"])
+    schema["properties"]["bar"] = dict(schema["properties"]["bar"], required=["nested"])
+
+    targets = _validation_targets(
+        schema, [("foo",), ("bar", "more_nested", "subkey"), ("bar", "nested"), ("x",)]
+    )
+    assert sorted(path for path, _ in targets) == [("bar",), ("foo",)]
+    assert _validation_targets(dict(schema, minProperties=1), [("foo",)]) is None
+    assert _validation_targets(schema, [("array_thing", "some_prop")]) == [
+        (("array_thing", "some_prop"), {"type": "array", "default": [1]})
+    ]
+
+
+def test_sections(monkeypatch):
+    from tests.test_sources.test_schema_utils import SECTIONED_SCHEMA
+
+    monkeypatch.setenv("db_port", "5432")
+    monkeypatch.setenv("db_timeout", "2.5")
+    monkeypatch.setenv("other", "from env")
+    conf = Conifer(SECTIONED_SCHEMA, sections=["db"])
+    assert conf.as_dict() == {"db": {"port": 5432, "timeout": 2.5}}
+    assert sorted(leaf.path for leaf in conf.plan.leaves) == [
+        ("db", "port"),
+        ("db", "timeout"),
+    ]
+
+    monkeypatch.setenv("db_timeout", "not a number")
+    with pytest.raises(ValueError):
+        conf.update_config()
+    with pytest.raises(KeyError):
+        Conifer(SECTIONED_SCHEMA, sections=["undefined"])
+
+
+def test_sections_unknown_variables(monkeypatch, recwarn):
+    from tests.test_sources.test_schema_utils import SECTIONED_SCHEMA
+
+    monkeypatch.setenv("APP_db_port", "5432")
+    monkeypatch.setenv("APP_http_timeout", "2.5")
+    source = EnvironmentConfigLoader(prefix="APP_")
+    conf = Conifer(SECTIONED_SCHEMA, sources=[source], sections=["db"])
+    assert conf.db.port == 5432
+    # keys of other sections aren't loaded, nor reported
+    assert "http" not in conf.as_dict()
+    assert source.unknown_variables == []
+    assert not recwarn.list
+
+    monkeypatch.setenv("APP_db_prot", "5432")
+    with pytest.warns(UserWarning, match="APP_db_prot"):
+        conf.update_config()
+    assert source.unknown_variables == ["APP_db_prot"]
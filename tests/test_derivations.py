@@ -0,0 +1,93 @@
+from conifer import Conifer
+from conifer.derivations import DerivationCycleError, DerivationGraph
+
+import pytest
+
+
+def test_multi_level_derivations(test_schema):
+    derivations = {
+        # declared before the derivation it depends on
+        "shout": {
+            "derivation": lambda greeting: greeting.upper(),
+            "parameters": ["greeting"],
+        },
+        "greeting": {"derivation": lambda foo: "hello " + foo, "parameters": ["foo"]},
+    }
+    conf = Conifer(test_schema, derivations=derivations)
+
+    assert conf["greeting"] == "hello bar"
+    assert conf["shout"] == "HELLO BAR"
+
+
+def test_derivation_cycle():
+    derivations = {
+        "a": {"derivation": lambda b: b, "parameters": ["b"]},
+        "b": {"derivation": lambda a: a, "parameters": ["a"]},
+    }
+    with pytest.raises(DerivationCycleError):
+        DerivationGraph(derivations)
+
+
+def test_derivations_rerun_when_changed(test_schema, monkeypatch, mocker):
+    from_foo = mocker.Mock(side_effect=lambda foo: foo * 2)
+    from_subkey = mocker.Mock(side_effect=lambda subkey: subkey + 1)
+    derivations = {
+        "double_foo": {"derivation": from_foo, "parameters": ["foo"]},
+        "bar": {
+            "next_subkey": {
+                "derivation": from_subkey,
+                "parameters": [["bar", "more_nested", "subkey"]],
+            }
+        },
+    }
+    conf = Conifer(test_schema, derivations=derivations)
+
+    monkeypatch.setenv("bar_more_nested_subkey", "5")
+    conf.update_config()
+
+    assert conf["bar"]["next_subkey"] == 6
+    assert conf["double_foo"] == "barbar"
+    assert from_subkey.call_count == 2
+    assert from_foo.call_count == 1
+
+
+def test_lazy_derivation(test_schema, monkeypatch, mocker):
+    from_foo = mocker.Mock(side_effect=lambda foo: foo.upper())
+    derivations = {
+        "bar": {
+            "loud_foo": {
+                "derivation": from_foo,
+                "parameters": ["foo"],
+                "lazy": True,
+            }
+        },
+        "loud_nested": {
+            "derivation": lambda nested: nested.upper(),
+            "parameters": [["bar", "nested"]],
+            "lazy": True,
+        },
+    }
+    conf = Conifer(test_schema, derivations=derivations)
+    assert from_foo.call_count == 0
+
+    assert conf.bar.loud_foo == "BAR"
+    assert conf["bar"]["loud_foo"] == "BAR"
+    assert conf.get_in(["bar", "loud_foo"]) == "BAR"
+    assert from_foo.call_count == 1
+
+    # unchanged parameters aren't derived again
+    monkeypatch.setenv("bar_nested", "reloaded")
+    conf.update_config()
+    assert conf["loud_nested"] == "RELOADED"
+    assert conf.as_dict()["bar"]["loud_foo"] == "BAR"
+    assert from_foo.call_count == 1
+
+
+def test_derivations_rerun_when_type_changed():
+    graph = DerivationGraph(
+        {"described": {"derivation": lambda flag: repr(flag), "parameters": ["flag"]}}
+    )
+    assert graph.derive({"flag": 1})["described"] == "1"
+    # equal, but not the same value
+    assert graph.derive({"flag": True})["described"] == "True"
+    assert graph.derive({"flag": 1.0})["described"] == "1.0"
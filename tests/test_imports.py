@@ -0,0 +1,16 @@
+import subprocess
+import sys
+
+
+def test_lazy_imports():
+    """import conifer must not import its slow dependencies."""
+    modules = subprocess.check_output(
+        [
+            sys.executable,
+            "-c",
+            "import sys, conifer; "
+            "print(' '.join(m for m in ('jsonschema', 'pyrsistent', 'yaml') "
+            "if m in sys.modules))",
+        ]
+    )
+    assert modules.strip() == b""
@@ -0,0 +1,175 @@
+from conifer import Conifer
+from conifer.sources import DictLoader, LazySource
+
+import pytest
+
+
+class CountingLoader(DictLoader):
+    def __init__(self, data):
+        super(CountingLoader, self).__init__(data)
+        self.loads = 0
+
+    def load_config(self, schema):
+        self.loads += 1
+        return super(CountingLoader, self).load_config(schema)
+
+
+def test_lazy_source(test_schema):
+    static = DictLoader({"foo": "static", "bar": {"nested": "static"}})
+    lazy = CountingLoader({"bar": {"nested": "lazy", "more_nested": {"subkey": 2}}})
+    last = DictLoader({"bar": {"more_nested": {"subkey": 3}}})
+    conf = Conifer(test_schema, sources=[static, LazySource(lazy, ["bar"]), last])
+    assert lazy.loads == 0
+
+    assert conf.foo == "static"
+    conf.update_config()
+    assert lazy.loads == 0
+
+    # merged in the order of sources
+    assert conf.bar.nested == "lazy"
+    assert conf.bar.more_nested.subkey == 3
+    assert lazy.loads == 1
+    assert conf.get_in(["bar", "nested"]) == "lazy"
+    assert lazy.loads == 1
+
+    # reloaded like any other source once loaded
+    lazy._data = {"bar": {"nested": "reloaded"}}
+    conf.update_config()
+    assert conf.bar.nested == "reloaded"
+    assert lazy.loads == 2
+
+
+def test_lazy_source_reads(test_schema):
+    def make_conf():
+        lazy = DictLoader({"bar": {"more_nested": {"subkey": 2}}})
+        lazy.provides = ["bar.more_nested"]
+        return Conifer(test_schema, sources=[lazy])
+
+    assert make_conf()["bar"]["more_nested"]["subkey"] == 2
+    assert make_conf().handle("bar.more_nested.subkey")() == 2
+    assert make_conf().as_dict()["bar"]["more_nested"] == {"subkey": 2}
+    assert make_conf().explain("bar.more_nested.subkey").value == 2
+    # values outside the prefixes don't load the source
+    conf = make_conf()
+    assert conf.bar.nested == "baz"
+    assert conf._partials == [None]
+
+    # lazy sources can be loaded explicitly
+    conf.update_config(sources=conf._sources)
+    assert conf._partials != [None]
+
+
+def test_lazy_source_scoped_and_override(test_schema):
+    lazy = CountingLoader({"bar": {"nested": "lazy"}})
+    conf = Conifer(test_schema, sources=[LazySource(lazy, ["bar.nested"])])
+
+    with conf.scoped({"foo": "scoped"}):
+        assert conf.foo == "scoped"
+        assert lazy.loads == 0
+        assert conf.bar.nested == "lazy"
+    assert lazy.loads == 1
+
+    lazy = CountingLoader({"bar": {"nested": "lazy"}})
+    conf = Conifer(test_schema, sources=[LazySource(lazy, ["bar.nested"])])
+    with conf.scoped({"bar": {"nested": "scoped"}}):
+        assert conf.bar.nested == "scoped"
+    assert conf.bar.nested == "lazy"
+
+    lazy = CountingLoader({"bar": {"nested": "lazy"}})
+    conf = Conifer(test_schema, sources=[LazySource(lazy, ["bar.nested"])])
+    override = conf.override(sources=[DictLoader({"foo": "override"})])
+    assert override.bar.nested == "lazy"
+    assert override.foo == "override"
+
+
+def test_lazy_source_derivations(test_schema):
+    lazy = CountingLoader({"foo": "lazy"})
+    derivations = {
+        "upper": {"parameters": ["foo"], "derivation": lambda foo: foo.upper()}
+    }
+    conf = Conifer(
+        test_schema, sources=[LazySource(lazy, ["foo"])], derivations=derivations
+    )
+    # derived on every reload, so the source can't wait
+    assert lazy.loads == 1
+    assert conf.upper == "LAZY"
+
+    lazy = CountingLoader({"foo": "lazy"})
+    derivations["upper"]["lazy"] = True
+    conf = Conifer(
+        test_schema, sources=[LazySource(lazy, ["foo"])], derivations=derivations
+    )
+    assert lazy.loads == 0
+    assert conf.upper == "LAZY"
+    assert lazy.loads == 1
+
+
+def test_lazy_source_error(test_schema):
+    lazy = DictLoader({"bar": {"more_nested": {"subkey": "not a number"}}})
+    conf = Conifer(test_schema, sources=[LazySource(lazy, ["bar"])])
+    with pytest.raises(ValueError):
+        conf.bar
+    assert conf.foo == "bar"
+
+
+def test_lazy_source_snapshot_consistent(test_schema):
+    static = DictLoader({"foo": "v1"})
+    lazy = DictLoader({"bar": {"nested": "lazy"}})
+    conf = Conifer(test_schema, sources=[static, LazySource(lazy, ["bar"])])
+    snapshot = conf.snapshot()
+
+    static._data = {"foo": "v2", "bar": {"more_nested": {"subkey": 2}}}
+    conf.update_config()
+
+    # the held snapshot loads the lazy source, but not the later reload
+    assert snapshot["bar"] == {"nested": "lazy", "more_nested": {"subkey": 1}}
+    assert snapshot["foo"] == "v1"
+    assert conf.bar.nested == "lazy"
+    assert conf.bar.more_nested.subkey == 2
+
+
+def test_lazy_source_override_defers(test_schema):
+    lazy = CountingLoader({"bar": {"nested": "lazy", "more_nested": {"subkey": 2}}})
+    conf = Conifer(test_schema, sources=[LazySource(lazy, ["bar"])])
+    override = conf.override(
+        sources=[DictLoader({"foo": "override", "bar": {"nested": "override"}})]
+    )
+    assert override.foo == "override"
+    assert lazy.loads == 0
+    assert override._validator is conf._validator
+
+    # merged under the override's own sources
+    assert override.bar.nested == "override"
+    assert override.bar.more_nested.subkey == 2
+    assert lazy.loads == 1
+    assert conf.bar.nested == "lazy"
+
+    lazy = CountingLoader({"bar": {"more_nested": {"subkey": 2}}})
+    source = LazySource(lazy, ["bar"])
+    conf = Conifer(test_schema, sources=[source])
+    override = conf.override(sources=[DictLoader({"foo": "override"})])
+    assert override.explain("bar.more_nested.subkey").source is source
+    assert lazy.loads == 1
+    with override.scoped({"bar": {"nested": "scoped"}}):
+        assert override.bar.nested == "scoped"
+        assert override.bar.more_nested.subkey == 2
+    assert lazy.loads == 1
+
+
+def test_lazy_source_eager_changes(test_schema):
+    eager = DictLoader({"bar": {"nested": "eager"}})
+    lazy = CountingLoader({"bar": {"more_nested": {"subkey": 2}}})
+    conf = Conifer(test_schema, sources=[eager, LazySource(lazy, ["bar"])])
+    called = []
+    conf.subscribe("bar", called.append)
+
+    # changed under the prefix of the lazy source, which stays unloaded
+    eager._data = {"bar": {"nested": "changed"}}
+    changes = conf.update_config()
+    assert list(changes) == [("bar", "nested")]
+    assert len(called) == 1
+    assert lazy.loads == 0
+    assert not conf.update_config()
+
+    assert conf.bar.nested == "changed"
+    assert conf.bar.more_nested.subkey == 2
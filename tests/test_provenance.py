@@ -0,0 +1,56 @@
+from conifer import Conifer
+from conifer.sources import DictLoader
+
+import pytest
+
+
+def test_explain(test_schema):
+    file_source = DictLoader({"foo": "from file", "bar": {"nested": "from file"}})
+    env_source = DictLoader({"bar": {"nested": "from env"}})
+    conf = Conifer(
+        test_schema,
+        sources=[file_source, env_source],
+        derivations={
+            "derived": {"parameters": ["foo"], "derivation": lambda foo: foo.upper()}
+        },
+    )
+
+    assert conf.explain("foo") == (("foo",), "from file", file_source)
+    assert conf.explain("bar.nested").source is env_source
+    assert conf.explain(["bar", "more_nested", "subkey"]).source == "defaults"
+    assert conf.explain("derived").source == "derivation"
+    with pytest.raises(KeyError):
+        conf.explain("bar")
+    with pytest.raises(KeyError):
+        conf.explain("undefined")
+
+    override_source = DictLoader({"foo": "overridden"})
+    override = conf.override(sources=[override_source])
+    assert override.explain("foo").source is override_source
+    assert override.explain("bar.nested").source is env_source
+
+    with conf.scoped({"foo": "scoped"}):
+        assert conf.explain("foo") == (("foo",), "scoped", "scoped")
+
+
+def test_selective_remerge(test_schema, mocker):
+    from conifer import conifer
+
+    static = DictLoader({"foo": "static", "bar": {"nested": "static"}})
+    changing = DictLoader({"bar": {"more_nested": {"subkey": 1}}})
+    conf = Conifer(test_schema, sources=[static, changing])
+    full_merge = mocker.spy(conifer, "_merge_sources")
+
+    changing._data = {"bar": {"more_nested": {"subkey": 2}}}
+    changes = conf.update_config(sources=[changing])
+    assert not full_merge.called
+    assert list(changes) == [("bar", "more_nested", "subkey")]
+    assert conf.as_dict()["bar"] == {"nested": "static", "more_nested": {"subkey": 2}}
+    assert conf.explain("bar.more_nested.subkey").source is changing
+
+    # removing a value reveals the one it shadowed
+    changing._data = {}
+    conf.update_config(sources=[changing])
+    assert conf.bar.more_nested.subkey == 1
+    assert conf.explain("bar.more_nested.subkey").source == "defaults"
+    assert not full_merge.called
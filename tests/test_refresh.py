@@ -0,0 +1,59 @@
+import time
+
+from conifer import Conifer
+from conifer.refresh import Refresher
+from conifer.sources import DictLoader
+
+
+class FlakyLoader(DictLoader):
+    """DictLoader which fails while `failing` is set."""
+
+    failing = False
+
+    def load_config(self, schema):
+        if self.failing:
+            raise IOError("source unavailable")
+        return super(FlakyLoader, self).load_config(schema)
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out waiting for condition"
+        time.sleep(0.01)
+
+
+def test_refresher(test_schema):
+    loader = FlakyLoader({"foo": "first"})
+    conf = Conifer(test_schema, sources=[loader])
+
+    with conf.start_refresher(interval=0.01, jitter=0.5) as refresher:
+        loader._data = {"foo": "second"}
+        _wait_for(lambda: conf["foo"] == "second")
+
+        # the last good configuration is served while the source fails
+        loader.failing = True
+        _wait_for(lambda: refresher.stats.consecutive_failures >= 2)
+        assert conf["foo"] == "second"
+
+        loader.failing = False
+        _wait_for(lambda: refresher.stats.consecutive_failures == 0)
+
+    stats = refresher.stats
+    assert stats.refreshes and stats.failures
+    assert isinstance(stats.last_latency, float)
+    assert stats.max_latency >= stats.mean_latency
+
+
+def test_refresher_backoff(test_schema):
+    refresher = Refresher(
+        Conifer(test_schema), interval=1, jitter=0, backoff_factor=2, max_interval=5
+    )
+    assert refresher.next_delay() == 1
+
+    refresher.stats.record(0.1, IOError())
+    refresher.stats.record(0.1, IOError())
+    assert refresher.next_delay() == 4
+
+    refresher.stats.record(0.1, IOError())
+    assert refresher.next_delay() == 5
@@ -0,0 +1,79 @@
+import threading
+
+from conifer import Conifer
+
+import pytest
+
+
+def test_scoped(conf):
+    with conf.scoped(
+        {"foo": "scoped", "bar": {"more_nested": {"subkey": "2"}}}
+    ) as snap:
+        assert conf.foo == "scoped"
+        assert conf["bar"]["more_nested"]["subkey"] == 2
+        assert conf.get_in(["bar", "nested"]) == "baz"
+        assert conf.snapshot() is snap
+        assert conf.handle("foo")() == "scoped"
+
+        with conf.scoped({"foo": "inner"}):
+            assert conf.foo == "inner"
+            assert conf.bar.more_nested.subkey == 2
+        assert conf.foo == "scoped"
+
+    assert conf.foo == "bar"
+    assert conf.bar.more_nested.subkey == 1
+
+
+def test_scoped_undefined(conf):
+    with pytest.raises(KeyError):
+        conf.scoped({"undefined": 1}).__enter__()
+    assert conf.snapshot() is conf._snapshot
+
+
+def test_scoped_reentered(conf):
+    scope = conf.scoped({"foo": "scoped"})
+    with scope:
+        with pytest.raises(RuntimeError):
+            scope.__enter__()
+        assert conf.foo == "scoped"
+    assert conf.foo == "bar"
+
+    # reusable once exited
+    with scope:
+        assert conf.foo == "scoped"
+    assert conf.foo == "bar"
+
+
+def test_scoped_threads(conf):
+    seen = {}
+    entered = threading.Barrier(2)
+
+    def worker(value):
+        with conf.scoped({"foo": value}):
+            entered.wait()
+            seen[value] = conf.foo
+
+    threads = [threading.Thread(target=worker, args=(v,)) for v in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == {"a": "a", "b": "b"}
+    assert conf.foo == "bar"
+
+
+def test_scoped_derivations(test_schema, mocker):
+    upper = mocker.Mock(side_effect=lambda foo: foo.upper())
+    conf = Conifer(
+        test_schema,
+        derivations={"derived": {"parameters": ["foo"], "derivation": upper}},
+    )
+    assert conf.derived == "BAR"
+    with conf.scoped({"foo": "baz"}):
+        assert conf.derived == "BAZ"
+    assert conf.derived == "BAR"
+
+    # scopes don't replace the results reloads re-use
+    conf.update_config()
+    assert upper.call_count == 2
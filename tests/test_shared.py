@@ -0,0 +1,41 @@
+import os
+
+from conifer import Conifer
+from conifer.shared import SharedConfig
+from conifer.sources import DictLoader
+
+import pytest
+
+
+def test_shared_config(test_schema, tmpdir):
+    path = str(tmpdir.join("config"))
+    source = DictLoader({"foo": "first"})
+    conf = Conifer(test_schema, sources=[source])
+    assert conf.publish(path) == 1
+
+    shared = SharedConfig(path)
+    assert shared.foo == "first"
+    assert shared.bar.nested == "baz"
+    assert shared.get_in(["bar", "more_nested", "subkey"]) == 1
+    assert shared.generation == 1
+    assert not shared.refresh()
+
+    source._data = {"foo": "second"}
+    conf.update_config()
+    conf.publish(path)
+
+    assert shared["foo"] == "second"
+    assert shared.generation == 2
+    assert shared.as_dict() == conf.as_dict()
+    assert os.listdir(str(tmpdir)) == ["config"]
+    shared.close()
+
+
+def test_shared_config_invalid(tmpdir):
+    path = tmpdir.join("config")
+    with pytest.raises(IOError):
+        SharedConfig(str(path))
+
+    path.write("not a snapshot")
+    with pytest.raises(ValueError):
+        SharedConfig(str(path))
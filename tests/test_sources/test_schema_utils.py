@@ -1,4 +1,18 @@
-from conifer.sources.schema_utils import iter_schema
+import json
+
+from jsonschema import ValidationError
+
+from conifer.sources import schema_utils
+from conifer.sources.schema_utils import (
+    SchemaPlan,
+    coerce_value,
+    compile_coercer,
+    compile_schema,
+    iter_schema,
+    select_sections,
+)
+
+import pytest
 
 
 def test_iter_schema(test_schema):
@@ -12,3 +26,144 @@ def test_iter_schema(test_schema):
         (["array_thing", "some_prop"], {"type": "array", "default": [1]}),
     ]
     assert sorted(iter_schema(test_schema)) == sorted(expected)
+
+
+def test_schema_plan(test_schema):
+    plan = SchemaPlan(test_schema)
+
+    assert (
+        plan.by_path[("bar", "more_nested", "subkey")].env_name
+        == "bar_more_nested_subkey"
+    )
+    assert plan.by_env_name["array_thing_some_prop"].schema == {
+        "type": "array",
+        "default": [1],
+    }
+    # resolving $ref doesn't modify the source schema
+    assert test_schema["properties"]["array_thing"] == {
+        "$ref": "#/definitions/reftype",
+        "default": {},
+    }
+    # plans are schemas too, and are never re-compiled
+    assert plan["properties"] == test_schema["properties"]
+    assert compile_schema(plan) is plan
+
+
+def test_schema_plan_memoizes_coercion():
+    plan = SchemaPlan({"properties": {"ratio": {"type": "number"}}})
+    coerce = plan.by_path[("ratio",)].coerce
+
+    # float() builds a new object each time, the memo returns the same one
+    assert coerce("1.5") is coerce("1.5")
+    assert coerce("1.5") is not compile_coercer({"type": "number"})("1.5")
+    # keyed on the type of the raw value too
+    assert coerce(1) == 1 and type(coerce(1)) is int
+
+
+SECTIONED_SCHEMA = {
+    "definitions": {
+        "port": {"type": "integer", "default": 80},
+        "unused": {"type": "string"},
+    },
+    "properties": {
+        "db": {
+            "type": "object",
+            "default": {},
+            "properties": {
+                "port": {"$ref": "#/definitions/port"},
+                "timeout": {"$ref": "#/properties/http/properties/timeout"},
+            },
+        },
+        "http": {
+            "type": "object",
+            "default": {},
+            "properties": {"timeout": {"type": "number", "default": 1.5}},
+        },
+        "other": {"type": "string", "default": "other"},
+    },
+    "additionalProperties": False,
+}
+
+
+def test_select_sections():
+    schema = select_sections(dict(SECTIONED_SCHEMA, required=["db", "other"]), ["db"])
+    assert list(schema["properties"]) == ["db"]
+    assert schema["required"] == ["db"]
+    assert "additionalProperties" not in schema
+    assert sorted(schema["definitions"]) == [
+        "port",
+        "properties/http/properties/timeout",
+    ]
+    # references into other sections are copied, and still resolve
+    assert sorted(iter_schema(schema)) == [
+        (["db", "port"], {"type": "integer", "default": 80}),
+        (["db", "timeout"], {"type": "number", "default": 1.5}),
+    ]
+    assert sorted(iter_schema(SECTIONED_SCHEMA, sections=["db"])) == sorted(
+        iter_schema(schema)
+    )
+    # references within selected sections are kept
+    schema = select_sections(SECTIONED_SCHEMA, ["db", "http"])
+    assert schema["properties"]["db"]["properties"]["timeout"] == {
+        "$ref": "#/properties/http/properties/timeout"
+    }
+    assert list(schema["definitions"]) == ["port"]
+
+    with pytest.raises(KeyError):
+        select_sections(SECTIONED_SCHEMA, ["undefined"])
+
+
+def test_select_sections_json():
+    # all strings of a schema loaded from JSON are unicode on py2
+    schema = json.loads(json.dumps(SECTIONED_SCHEMA))
+    schema["properties"]["db"]["properties"]["mode"] = {"enum": ["ro", "rw"]}
+    selected = select_sections(schema, ["db"])
+    assert selected["properties"]["db"]["properties"]["mode"] == {"enum": ["ro", "rw"]}
+    assert selected["properties"]["db"]["properties"]["timeout"] == {
+        "$ref": "#/definitions/properties~1http~1properties~1timeout"
+    }
+    assert sorted(iter_schema(selected))[1] == (
+        ["db", "port"],
+        {"type": "integer", "default": 80},
+    )
+
+
+@pytest.mark.parametrize(
+    "value, schema, expected",
+    [
+        (None, {"type": "integer"}, None),
+        ("2", {"type": "integer", "minimum": 1}, 2),
+        ("1.5", {"type": "number"}, 1.5),
+        ("a, b", {"type": "array"}, ["a", "b"]),
+        ("yes", {"type": "boolean"}, True),
+        ("{a: 1}", {"type": "object"}, {"a": 1}),
+        ("3", {"type": ["null", "integer"]}, 3),
+        ("INFO", {"type": "string", "enum": ["DEBUG", "INFO"]}, "INFO"),
+        ("4", {"anyOf": [{"type": "integer"}, {"type": "string"}]}, 4),
+    ],
+)
+def test_coerce_value(value, schema, expected):
+    assert coerce_value(value, schema) == expected
+
+
+@pytest.mark.parametrize(
+    "value, schema",
+    [
+        ("0", {"type": "integer", "minimum": 1}),
+        ("abc", {"type": "string", "pattern": "^[0-9]+$"}),
+        ("TRACE", {"type": "string", "enum": ["DEBUG", "INFO"]}),
+        ("2", {"type": "integer", "multipleOf": 3}),
+    ],
+)
+def test_coerce_value_invalid(value, schema):
+    with pytest.raises(ValidationError):
+        coerce_value(value, schema)
+
+
+def test_compile_coercer_memo(mocker):
+    to_number = mocker.Mock(side_effect=int)
+    mocker.patch.dict(schema_utils._coercion_matrix[str], {"number": to_number})
+    coerce = compile_coercer({"type": "number"}, memo_size=2)
+
+    assert coerce("8080") == coerce("8080") == 8080
+    assert to_number.call_count == 1
@@ -1,4 +1,6 @@
-from conifer.utils import recursive_update
+from copy import deepcopy
+
+from conifer.utils import merge_layers, recursive_update
 
 import pytest
 
@@ -15,3 +17,72 @@ import pytest
 def test_recursive_update(original, updates, expected):
     recursive_update(original, updates)
     assert original == expected
+
+
+@pytest.mark.parametrize(
+    "layers",
+    [
+        [{}, {1: 2}],
+        [{1: {2: 3}}, {1: {2: 4, 3: 5}}, {1: {4: 6}}],
+        [{1: {2: 3}}, {1: "x"}, {1: {3: 4}}],
+        [{1: {2: 3}}, {1: {3: 4}}, {1: None}],
+        [{1: {2: {3: 4}}}, {5: 6}, {1: {2: {7: 8}}}],
+    ],
+)
+def test_merge_layers(layers):
+    expected = {}
+    for layer in deepcopy(layers):
+        recursive_update(expected, layer)
+    original = deepcopy(layers)
+
+    assert merge_layers(layers) == expected
+    assert layers == original
+
+
+def test_merge_layers_shares_unchanged():
+    defaults = {"a": {"x": 1}, "b": {"y": 2}}
+    previous = merge_layers([defaults, {"b": {"y": 3}}])
+    assert previous["a"] is defaults["a"]
+
+    config = merge_layers([defaults, {"b": {"y": 3}}], previous)
+    assert config is previous
+
+    config = merge_layers([defaults, {"b": {"y": 4}}], previous)
+    assert config["a"] is previous["a"]
+    assert config["b"] == {"y": 4}
+
+    # equal values of another type are a change
+    previous = merge_layers([{"a": {"x": 0}, "b": [1]}])
+    config = merge_layers([{"a": {"x": False}, "b": [1.0]}], previous)
+    assert config["a"]["x"] is False
+    assert type(config["b"][0]) is float
+
+
+@pytest.mark.parametrize(
+    "old, new, same",
+    [
+        (0, 0, True),
+        (0, False, False),
+        (1, 1.0, False),
+        ({"a": [1, {"b": True}]}, {"a": [1, {"b": True}]}, True),
+        ({"a": [1, {"b": True}]}, {"a": [1, {"b": 1}]}, False),
+        ({"a": 1}, {"a": 1, "b": 2}, False),
+    ],
+)
+def test_same_value(old, new, same):
+    from conifer.utils import same_value
+
+    assert same_value(old, new) is same
+
+
+def test_merge_paths():
+    from conifer.changes import changed_paths
+    from conifer.utils import merge_paths
+
+    layers = [{1: {2: 3, 4: 5}}, {1: {2: 6}, 7: 8}, {1: "x"}]
+    previous = merge_layers(layers)
+
+    new_layers = [layers[0], {1: {9: 10}}, {1: {11: 12}}]
+    paths = changed_paths(layers[1], new_layers[1])
+    paths += changed_paths(layers[2], new_layers[2])
+    assert merge_paths(new_layers, previous, paths) == merge_layers(new_layers)
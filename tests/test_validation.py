@@ -0,0 +1,99 @@
+from jsonschema import Draft4Validator, ValidationError
+
+from conifer.validation import CompiledValidator, compile_validator
+
+import pytest
+
+DEFINITIONS = {"port": {"type": "integer", "minimum": 1, "maximum": 65535}}
+
+# (schema, instances), each instance is checked against Draft4Validator
+CASES = [
+    ({"type": "string"}, ["a", 1, None, True]),
+    ({"type": ["string", "null"]}, ["a", None, 1]),
+    ({"type": "integer"}, [1, 1.0, True, "1"]),
+    ({"type": "number"}, [1, 1.5, False, "1"]),
+    ({"type": "boolean"}, [True, 0]),
+    ({"enum": [1, "a", None]}, [1, 1.0, True, "a", None, "b", [1], {}]),
+    ({"enum": [True]}, [True, 1]),
+    ({"minimum": 2, "maximum": 4}, [1, 2, 4, 5, "x", True]),
+    (
+        {
+            "minimum": 2,
+            "exclusiveMinimum": True,
+            "maximum": 4,
+            "exclusiveMaximum": True,
+        },
+        [2, 3, 4, 2.5],
+    ),
+    ({"minLength": 2, "maxLength": 3, "pattern": "^a"}, ["a", "ab", "ba", "abcd", 1]),
+    ({"items": {"type": "integer"}, "minItems": 1, "maxItems": 2}, [[], [1], [1, "a"]]),
+    ({"items": [{"type": "integer"}]}, [[1], ["a"]]),
+    (
+        {
+            "type": "object",
+            "properties": {
+                "a": {"type": "string"},
+                "b": {"$ref": "#/definitions/port"},
+            },
+            "required": ["a"],
+            "additionalProperties": False,
+            "definitions": DEFINITIONS,
+        },
+        [
+            {"a": "x"},
+            {"a": "x", "b": 80},
+            {"a": "x", "b": 0},
+            {"b": 80},
+            {"a": "x", "c": 1},
+        ],
+    ),
+    (
+        {"additionalProperties": {"type": "integer"}, "minProperties": 1},
+        [{}, {"a": 1}, {"a": "1"}, []],
+    ),
+    ({"patternProperties": {"^x": {"type": "integer"}}}, [{"xa": 1}, {"xa": "1"}]),
+    ({"anyOf": [{"type": "string"}, {"minimum": 3}]}, ["a", 3, 1]),
+    ({"oneOf": [{"type": "integer"}, {"minimum": 3}]}, [1, 4, 4.5, 2.5]),
+    ({"allOf": [{"type": "integer"}, {"minimum": 3}], "not": {"enum": [5]}}, [3, 5, 2]),
+    ({"multipleOf": 2}, [4, 3]),
+    # blocks opened for subschemas which check nothing
+    ({"properties": {"a": {}}}, [{"a": 1}, 1]),
+    ({"properties": {"a": {"items": {}}}}, [{"a": [1]}, {"a": 1}]),
+    ({"items": {"description": "anything"}}, [[1], 1]),
+    ({"$ref": "#/definitions/port", "definitions": DEFINITIONS}, [80, 0, "80"]),
+    (
+        {
+            "definitions": {
+                "tree": {"type": "object", "properties": {"child": {"$ref": "#"}}}
+            },
+            "$ref": "#/definitions/tree",
+        },
+        [{"child": {"child": {}}}, {"child": {"child": 1}}],
+    ),
+]
+
+
+@pytest.mark.parametrize("schema,instances", CASES)
+def test_compiled_validator_matches_jsonschema(schema, instances):
+    compiled = CompiledValidator(schema)
+    reference = Draft4Validator(schema)
+    for instance in instances:
+        assert compiled.is_valid(instance) == reference.is_valid(instance), instance
+
+
+def test_compiled_validator_errors(test_schema):
+    validator = compile_validator(test_schema)
+    validator.validate({"foo": "x"})
+    with pytest.raises(ValidationError) as error:
+        validator.validate({"bar": {"nested": 1}})
+    assert list(error.value.path) == ["bar", "nested"]
+
+
+def test_compiled_validator_deep_schema():
+    schema = {"type": "integer"}
+    for _ in range(50):
+        schema = {"type": "object", "properties": {"a": schema}}
+    instance = 1
+    for _ in range(50):
+        instance = {"a": instance}
+    assert CompiledValidator(schema).is_valid(instance)
@@ -0,0 +1,79 @@
+import json
+import os
+import time
+
+from conifer import Conifer
+from conifer.sources import EnvironmentConfigLoader, JSONFileLoader, LazySource
+from conifer.watch import ConfigWatcher
+
+import pytest
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("timed out waiting for condition")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def json_path(tmp_path):
+    path = tmp_path / "conf.json"
+    path.write_text(json.dumps({"foo": "original"}))
+    return str(path)
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watch_reloads(json_path, test_schema, use_inotify):
+    conf = Conifer(test_schema, sources=[JSONFileLoader(path=json_path)])
+    watcher = ConfigWatcher(
+        conf, debounce=0.05, poll_interval=0.05, use_inotify=use_inotify
+    )
+
+    with watcher:
+        # editors write a temporary file, then rename it over the original
+        tmp_path = json_path + ".tmp"
+        with open(tmp_path, "w") as tmp_file:
+            json.dump({"foo": "edited"}, tmp_file)
+        os.rename(tmp_path, json_path)
+
+        _wait_for(lambda: conf["foo"] == "edited")
+
+    assert watcher.reload_count == 1
+
+
+def test_watch_reloads_changed_sources_only(json_path, test_schema, mocker):
+    env_loader = EnvironmentConfigLoader()
+    conf = Conifer(test_schema, sources=[env_loader, JSONFileLoader(path=json_path)])
+    load_env = mocker.spy(env_loader, "load_config")
+
+    with conf.watch(debounce=0.05, poll_interval=0.05) as watcher:
+        with open(json_path, "w") as json_file:
+            json.dump({"foo": "edited"}, json_file)
+        _wait_for(lambda: watcher.reload_count)
+
+    assert conf["foo"] == "edited"
+    assert load_env.call_count == 0
+
+
+def test_watch_skips_unloaded_lazy_sources(json_path, test_schema, mocker):
+    loader = JSONFileLoader(path=json_path)
+    conf = Conifer(test_schema, sources=[LazySource(loader, ["foo"])])
+    load = mocker.spy(loader, "load_config")
+    watcher = ConfigWatcher(conf)
+
+    with open(json_path, "w") as json_file:
+        json.dump({"foo": "edited"}, json_file)
+    watcher._reload({json_path})
+
+    assert load.call_count == 0
+    assert watcher.reload_count == 0
+    assert conf["foo"] == "edited"
+
+    with open(json_path, "w") as json_file:
+        json.dump({"foo": "edited again"}, json_file)
+    watcher._reload({json_path})
+
+    assert watcher.reload_count == 1
+    assert conf["foo"] == "edited again"